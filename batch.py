@@ -0,0 +1,172 @@
+#!/usr/bin/env python3
+"""
+Analiză în lot pentru liste de URL-uri și playlist-uri YouTube (pre-încălzirea catalogului)
+
+Descărcările (limitate de rețea) rulează în N fire, iar analizele (limitate de CPU)
+în M procese; o piesă descărcată intră în analiză cât timp următoarele se descarcă.
+"""
+
+import asyncio
+import json
+import os
+import tempfile
+import time
+from typing import Any, AsyncIterator, Dict, Iterable, List, Optional, Set
+
+from download import download_audio, extract_video_id
+from workers import (
+    ANALYSIS_WORKERS, AnalysisPool, QueueFullError, analysis_cache, analyze_file, result_key
+)
+
+BATCH_DOWNLOAD_WORKERS = int(os.environ.get("BATCH_DOWNLOAD_WORKERS", "4"))
+
+
+def expand_urls(urls: Iterable[str]) -> List[str]:
+    """
+    Înlocuiește playlist-urile cu URL-urile videoclipurilor (extragere "flat", fără descărcare)
+    """
+    import yt_dlp
+
+    expanded = []
+    for url in urls:
+        url = url.strip()
+        if not url or url.startswith("#"):
+            continue
+        if extract_video_id(url) is not None or "list=" not in url:
+            expanded.append(url)
+            continue
+        opts = {'quiet': True, 'no_warnings': True, 'extract_flat': 'in_playlist'}
+        with yt_dlp.YoutubeDL(opts) as ydl:
+            info = ydl.extract_info(url, download=False)
+        for entry in info.get("entries") or []:
+            video_id = entry.get("id")
+            if video_id:
+                expanded.append(f"https://www.youtube.com/watch?v={video_id}")
+    return expanded
+
+
+def read_done_ids(path: str) -> Set[str]:
+    """ID-urile deja prezente într-un fișier JSON Lines cu rezultate"""
+    done = set()
+    if not os.path.exists(path):
+        return done
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            if record.get("status") in ("ok", "cached") and record.get("video_id"):
+                done.add(record["video_id"])
+    return done
+
+
+async def run_batch(urls: Iterable[str], pool: AnalysisPool,
+                    download_workers: int = BATCH_DOWNLOAD_WORKERS,
+                    skip_ids: Optional[Set[str]] = None) -> AsyncIterator[Dict[str, Any]]:
+    """
+    Rulează lotul și produce câte o înregistrare per piesă, în ordinea finalizării
+
+    Piesele deja în cache nu se mai descarcă; cele din skip_ids sunt ignorate complet.
+    Rezultatele noi sunt salvate în cache, ca API-ul să le servească imediat.
+    """
+    skip_ids = skip_ids or set()
+    downloads = asyncio.Semaphore(max(1, download_workers))
+    # Piese descărcate care așteaptă analiza: limitează spațiul temporar pe disc
+    in_flight = asyncio.Semaphore(max(1, download_workers) + pool.capacity)
+    results: asyncio.Queue = asyncio.Queue()
+
+    async def process(url: str):
+        video_id = extract_video_id(url)
+        record: Dict[str, Any] = {"video_id": video_id, "url": url}
+        key = result_key(url)
+        cached = await asyncio.to_thread(analysis_cache.get, key)
+        if cached is not None:
+            await results.put({**record, "status": "cached", "result": cached})
+            return
+
+        async with in_flight:
+            try:
+                with tempfile.TemporaryDirectory() as tmpdir:
+                    async with downloads:
+                        info, audio_path = await asyncio.to_thread(download_audio, url, tmpdir)
+                    while True:
+                        try:
+                            result = await pool.run(analyze_file, audio_path, info, None, key)
+                            break
+                        except QueueFullError as e:
+                            await asyncio.sleep(min(e.retry_after, 5))
+                await asyncio.to_thread(analysis_cache.put, key, result)
+                record.update(status="ok", result=result)
+            except Exception as e:
+                record.update(status="error", error=str(e))
+        await results.put(record)
+
+    tasks = []
+    seen = set()
+    for url in urls:
+        key = result_key(url)
+        if extract_video_id(url) in skip_ids or key in seen:
+            continue
+        seen.add(key)
+        tasks.append(asyncio.create_task(process(url)))
+
+    for _ in range(len(tasks)):
+        yield await results.get()
+
+
+async def run_batch_to_file(urls: List[str], output: str, download_workers: int,
+                            analysis_workers: int) -> Dict[str, float]:
+    """Scrie rezultatele lotului în JSON Lines, sărind ID-urile deja prezente în fișier"""
+    pool = AnalysisPool(workers=analysis_workers, queue_size=len(urls))
+    counts = {"ok": 0, "cached": 0, "error": 0}
+    start = time.perf_counter()
+    try:
+        with open(output, "a", encoding="utf-8") as f:
+            async for record in run_batch(urls, pool, download_workers, read_done_ids(output)):
+                f.write(json.dumps(record, ensure_ascii=False) + "\n")
+                f.flush()
+                counts[record["status"]] += 1
+                status = "✅" if record["status"] != "error" else "❌"
+                print(f"{status} {record['url']} ({record['status']})")
+    finally:
+        pool.shutdown()
+    elapsed = time.perf_counter() - start
+    counts["seconds"] = elapsed
+    counts["songs_per_minute"] = (counts["ok"] + counts["cached"]) * 60 / max(elapsed, 1e-9)
+    return counts
+
+
+def main():
+    """Funcția principală"""
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Analiză în lot pentru URL-uri și playlist-uri YouTube")
+    parser.add_argument("urls", nargs="*", help="URL-uri de videoclipuri sau playlist-uri")
+    parser.add_argument("--file", help="Fișier cu câte un URL pe linie")
+    parser.add_argument("--output", default="results.jsonl", help="Fișierul JSON Lines cu rezultate")
+    parser.add_argument("--download-workers", type=int, default=BATCH_DOWNLOAD_WORKERS,
+                        help="Descărcări simultane")
+    parser.add_argument("--analysis-workers", type=int, default=ANALYSIS_WORKERS,
+                        help="Procese de analiză")
+
+    args = parser.parse_args()
+
+    urls = list(args.urls)
+    if args.file:
+        with open(args.file, encoding="utf-8") as f:
+            urls.extend(f.read().splitlines())
+    urls = expand_urls(urls)
+
+    print(f"🚀 Analizez {len(urls)} piese ({args.download_workers} descărcări, "
+          f"{args.analysis_workers} procese de analiză)")
+    counts = asyncio.run(run_batch_to_file(urls, args.output, args.download_workers,
+                                           args.analysis_workers))
+    print("=" * 50)
+    print(f"📋 Analizate: {counts['ok']}, din cache: {counts['cached']}, erori: {counts['error']}")
+    print(f"⏱️  {counts['seconds']:.1f}s, {counts['songs_per_minute']:.1f} piese/minut")
+    exit(1 if counts["error"] else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,549 @@
+#!/usr/bin/env python3
+"""
+Benchmark offline pentru motorul de analiză (fără rețea, audio sintetic)
+"""
+
+import os
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+import warnings
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+import soundfile as sf
+
+from analysis import (
+    ANALYSIS_SR, AnalysisContext, analyze_audio, analyze_rhythm, detect_chords_advanced, warm_up
+)
+from drums import _arrangement, arrange_drums, generate_drum_pattern
+from metrics import collect
+
+# Bugetul de pornire (secunde, import cumulat) per modul de aplicație; la import nu
+# trebuie încărcat niciun modul DSP (se încarcă doar pe calea de analiză)
+STARTUP_BUDGETS = {"lite": 1.0, "main": 1.5}
+DSP_MODULES = ("librosa", "numpy", "scipy", "numba", "yt_dlp")
+
+# Cazurile suitei (--suite): (durata în secunde, BPM-ul click-ului), progresia C-G-Am-F
+# cu 2 s per acord; cazurile peste STREAM_MIN_DURATION trec prin analiza pe blocuri
+SUITE_CASES = ((30, 90), (180, 120), (600, 128), (3600, 100))
+SUITE_PROGRESSION = ["C", "G", "Am", "F"]
+SUITE_KEY = "C major"
+# Pragurile de corectitudine față de adevărul sintetic și toleranța la regresii de timp
+MIN_CHORD_ACCURACY = 0.9
+MAX_TEMPO_ERROR = 0.03
+REGRESSION_TOLERANCE = 1.25
+
+# Notele (pitch class) pentru acordurile din progresia sintetică
+CHORD_PITCHES = {
+    "C": [0, 4, 7],
+    "G": [7, 11, 2],
+    "Am": [9, 0, 4],
+    "F": [5, 9, 0],
+}
+
+
+def synth_progression(progression: List[str], chord_seconds: float = 2.0,
+                      sr: int = 22050, repeats: int = 1,
+                      bpm: float = 0.0) -> Tuple[np.ndarray, List[Tuple[float, str]]]:
+    """Generează audio cu o progresie de acorduri (sinusoide + armonici), opțional cu click la bpm"""
+    t = np.arange(int(chord_seconds * sr)) / sr
+    blocks, truth = [], []
+    for r in range(repeats):
+        for i, chord in enumerate(progression):
+            block = np.zeros_like(t)
+            for pc in CHORD_PITCHES[chord]:
+                f0 = 261.63 * 2 ** (pc / 12)
+                for h, amp in ((1, 1.0), (2, 0.4), (3, 0.2)):
+                    block += amp * np.sin(2 * np.pi * f0 * h * t)
+            blocks.append(block)
+            truth.append(((r * len(progression) + i) * chord_seconds, chord))
+    y = np.concatenate(blocks)
+    if bpm:
+        add_clicks(y, sr, bpm)
+    return (0.3 * y / np.max(np.abs(y))).astype(np.float32), truth
+
+
+def add_clicks(y: np.ndarray, sr: int, bpm: float, level: Optional[float] = None):
+    """Adaugă (in-place) un click la fiecare beat, la tempo-ul bpm"""
+    click = np.hanning(200).astype(y.dtype) * (level or np.max(np.abs(y)))
+    for start in (np.arange(0, len(y) / sr, 60.0 / bpm) * sr).astype(int):
+        y[start:start + len(click)] += click[:len(y) - start]
+
+
+def synth_song(seconds: float, bpm: float, sr: int = ANALYSIS_SR,
+               progression: List[str] = SUITE_PROGRESSION) -> Tuple[np.ndarray, List[Tuple[float, str]]]:
+    """
+    Piesă sintetică de lungime arbitrară: un ciclu al progresiei repetat (np.tile), plus
+    click-uri la bpm; memoria este cea a semnalului final (float32), nu a sintezei
+    """
+    cycle, cycle_truth = synth_progression(progression, sr=sr)
+    repeats = int(np.ceil(seconds * sr / len(cycle)))
+    y = np.tile(cycle, repeats)[:int(seconds * sr)]
+    add_clicks(y, sr, bpm, level=0.3)
+    y *= 0.5
+    cycle_seconds = len(cycle) / sr
+    truth = [(r * cycle_seconds + t, chord) for r in range(repeats) for t, chord in cycle_truth
+             if r * cycle_seconds + t + 2.0 <= seconds]
+    return y, truth
+
+
+def legacy_chords_per_segment(audio_path: str, sr: int) -> List[Dict]:
+    """Calea veche: chroma_cqt recalculat pentru fiecare segment de 500ms (referință)"""
+    import librosa
+    y, sr = librosa.load(audio_path, sr=sr)
+    segment_duration = 0.5
+    chords = []
+    warnings.filterwarnings("ignore", message="n_fft=")
+    for i in range(0, len(y), int(sr * segment_duration)):
+        segment = y[i:i + int(sr * segment_duration)]
+        if len(segment) < sr * 0.25:
+            continue
+        chroma_avg = np.mean(librosa.feature.chroma_cqt(y=segment, sr=sr, hop_length=512), axis=1)
+        chords.append({"timp": i / sr, "chroma": chroma_avg / (np.sum(chroma_avg) + 1e-8)})
+    return chords
+
+
+def chord_accuracy(chords: List[Dict], truth: List[Tuple[float, str]], chord_seconds: float = 2.0) -> float:
+    """Procentul de acorduri din adevărul sintetic regăsite la mijlocul fiecărui interval"""
+    if not chords:
+        return 0.0
+    starts = np.array([c["timp"] for c in chords])
+    hits = 0
+    for t, name in truth:
+        idx = np.searchsorted(starts, t + chord_seconds / 2) - 1
+        hits += idx >= 0 and chords[idx]["acord"] == name
+    return hits / len(truth)
+
+
+def timed(fn, *args, **kwargs):
+    start = time.perf_counter()
+    result = fn(*args, **kwargs)
+    return result, time.perf_counter() - start
+
+
+def bench_chords(seconds: float = 60.0, sr: int = 22050):
+    """Compară calea per-segment cu motorul pe frame-uri"""
+    progression = ["C", "G", "Am", "F"]
+    repeats = max(1, int(seconds // (2.0 * len(progression))))
+    y, truth = synth_progression(progression, sr=sr, repeats=repeats, bpm=120)
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        path = os.path.join(tmpdir, "synth.wav")
+        sf.write(path, y, sr)
+
+        legacy, t_legacy = timed(legacy_chords_per_segment, path, sr)
+        frames, t_frames = timed(lambda: detect_chords_advanced(AnalysisContext.from_file(path, sr=sr)))
+
+    print(f"Audio sintetic: {len(y) / sr:.1f}s @ {sr} Hz")
+    print(f"   - Per segment (vechi): {t_legacy:.2f}s ({len(legacy)} segmente)")
+    print(f"   - Pe beat-uri + Viterbi (nou): {t_frames:.2f}s ({len(frames)} intervale de acord)")
+    print(f"   - Acuratețe acorduri: {chord_accuracy(frames, truth):.0%}")
+    print(f"   - Accelerare: {t_legacy / max(t_frames, 1e-9):.1f}x")
+    return t_legacy, t_frames
+
+
+def bench_rhythm(seconds: float = 60.0, sr: int = 22050, bpm: float = 120.0):
+    """Etapa de ritm: două beat_track din waveform (vechi) vs o singură anvelopă de onset"""
+    import librosa
+
+    y, _ = synth_progression(["C", "G", "Am", "F"], sr=sr, repeats=max(1, int(seconds // 8)), bpm=bpm)
+
+    def legacy():
+        librosa.beat.beat_track(y=y, sr=sr, hop_length=512, start_bpm=120)
+        return librosa.beat.beat_track(y=y, sr=sr, hop_length=512)
+
+    def shared():
+        onset_env = librosa.onset.onset_strength(y=y, sr=sr, hop_length=512)
+        return analyze_rhythm(onset_env, sr)
+
+    legacy()  # încălzire numba
+    _, t_legacy = timed(legacy)
+    rhythm, t_shared = timed(shared)
+
+    print(f"Ritm ({len(y) / sr:.0f}s, click la {bpm:.0f} BPM):")
+    print(f"   - Două beat_track (vechi): {t_legacy:.3f}s")
+    print(f"   - Anvelopă partajată (nou): {t_shared:.3f}s ({t_shared / max(t_legacy, 1e-9):.0%} din vechi)")
+    print(f"   - Tempo: {rhythm['tempo']:.1f} BPM, măsuri: {len(rhythm['downbeats'])}")
+    return t_legacy, t_shared
+
+
+def bench_pipeline(seconds: float = 60.0, sr: int = 44100):
+    """Timpul și memoria de vârf pentru pipeline-ul complet (o singură decodare)"""
+    progression = ["C", "G", "Am", "F"]
+    y, _ = synth_progression(progression, sr=sr, repeats=max(1, int(seconds // 8)))
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        path = os.path.join(tmpdir, "synth.wav")
+        sf.write(path, y, sr)
+        del y
+
+        tracemalloc.start()
+        result, elapsed = timed(lambda: analyze_audio(AnalysisContext.from_file(path)))
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+    print(f"Pipeline complet ({result['duration']:.0f}s audio, sursă {sr} Hz):")
+    print(f"   - Timp: {elapsed:.2f}s")
+    print(f"   - Memorie de vârf (NumPy/Python): {peak / 2**20:.1f} MiB")
+    print(f"   - Tempo: {result['tempo']} BPM, acorduri: {len(result['chords'])}")
+    return elapsed, peak
+
+
+def bench_resume(seconds: float = 60.0, preview: float = 45.0, sr: int = 22050):
+    """Analiza completă de la zero vs reluată din caracteristicile unui preview"""
+    y, truth = synth_progression(["C", "G", "Am", "F"], sr=sr, repeats=max(1, int(seconds // 8)), bpm=120)
+    prefix = AnalysisContext(y[:int(preview * sr)], sr)
+    analyze_audio(prefix)
+    features = prefix.prefix_features()
+
+    fresh, t_fresh = timed(lambda: analyze_audio(AnalysisContext(y, sr)))
+
+    def resumed():
+        ctx = AnalysisContext(y, sr)
+        ctx.resume_from(features)
+        return analyze_audio(ctx)
+
+    result, t_resumed = timed(resumed)
+    same = [c["acord"] for c in fresh["chords"]] == [c["acord"] for c in result["chords"]]
+
+    print(f"Reluare după preview ({preview:.0f}s din {len(y) / sr:.0f}s):")
+    print(f"   - Analiză completă de la zero: {t_fresh:.2f}s")
+    print(f"   - Reluată din prefix: {t_resumed:.2f}s ({t_resumed / max(t_fresh, 1e-9):.0%})")
+    print(f"   - Aceleași acorduri: {'da' if same else 'nu'}, acuratețe: {chord_accuracy(result['chords'], truth):.0%}")
+    return t_fresh, t_resumed
+
+
+def bench_formats(seconds: float = 600.0, sr: int = 22050):
+    """Dimensiunea și timpul de codare ale răspunsului: JSON vs msgpack vs .npz (și gzip)"""
+    import gzip
+
+    from formats import encode_msgpack, encode_npz
+    from main import AnalysisResult
+
+    y, _ = synth_progression(["C", "G", "Am", "F"], sr=sr, repeats=max(1, int(seconds // 8)), bpm=120)
+    result = analyze_audio(AnalysisContext(y, sr))
+    result["title"] = "Synth"
+
+    print(f"Formate de răspuns ({len(y) / sr:.0f}s, {len(result['chords'])} acorduri, {len(result['beats'])} beat-uri):")
+    encoders = {
+        "JSON": lambda: AnalysisResult.model_validate(result).model_dump_json().encode(),
+        "msgpack": lambda: encode_msgpack(result),
+        "npz": lambda: encode_npz(result),
+    }
+    for name, encode in encoders.items():
+        body, elapsed = timed(encode)
+        print(f"   - {name}: {len(body) / 1024:.1f} KiB ({len(gzip.compress(body, 5)) / 1024:.1f} KiB gzip), "
+              f"{elapsed * 1000:.1f} ms")
+
+
+def run_case(seconds: float, bpm: float, sr: int = ANALYSIS_SR) -> Dict[str, Any]:
+    """
+    Un caz al suitei, pe calea serverului (workers.analyze_file: decodare din fișier,
+    analiză completă sau pe blocuri după durată): timpul total și pe etape, memoria de
+    vârf și corectitudinea față de adevărul sintetic
+    """
+    from streaming import STREAM_MIN_DURATION
+    from workers import analyze_file
+
+    y, truth = synth_song(seconds, bpm, sr)
+    with tempfile.TemporaryDirectory() as tmpdir:
+        path = os.path.join(tmpdir, "synth.wav")
+        sf.write(path, y, sr, subtype="PCM_16")
+        del y
+
+        tracemalloc.start()
+        with collect() as timings:
+            result, elapsed = timed(analyze_file, path, {"title": "Synth", "duration": seconds})
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+    accuracy = chord_accuracy(result["chords"], truth)
+    tempo_error = abs(result["tempo"] - bpm) / bpm
+    key = f"{result['key']} {result['mode']}"
+    return {
+        "case": f"{seconds:g}s@{bpm:g}",
+        "seconds": seconds,
+        "bpm": bpm,
+        "path": "streaming" if seconds > STREAM_MIN_DURATION else "full",
+        "total": elapsed,
+        "stages": dict(timings.stages),
+        "peak_mib": peak / 2**20,
+        "chord_accuracy": accuracy,
+        "tempo": result["tempo"],
+        "tempo_error": tempo_error,
+        "key": key,
+        "passed": accuracy >= MIN_CHORD_ACCURACY and tempo_error <= MAX_TEMPO_ERROR and key == SUITE_KEY,
+    }
+
+
+def bench_drums(calls: int = 2000, song_seconds: float = 300.0, bpm: float = 120.0) -> Dict[str, Any]:
+    """
+    Timpul per apel generate_drum_pattern (toate stilurile), aranjamentul pe o piesă de
+    song_seconds cu tempo variabil (la primul apel și memoizat) și alinierea la măsuri
+    """
+    styles = ("rock", "pop", "jazz", "electronic")
+    start = time.perf_counter()
+    for i in range(calls):
+        generate_drum_pattern(60 + i % 120, styles[i % len(styles)])
+    per_call = (time.perf_counter() - start) / calls
+    passed = all(
+        0 <= hit["time"] < 4 * 60.0 / tempo
+        for tempo in (60, 120, 180) for style in styles
+        for hit in generate_drum_pattern(tempo, style)
+    )
+
+    # Grilă de beat-uri cu tempo care variază lent (±2%), anacruză de un beat
+    period = 60.0 / bpm
+    n = int(song_seconds / period)
+    beats = 0.2 + np.cumsum(period * (1 + 0.02 * np.sin(np.arange(n) / 40)))
+    downbeats = beats[1::4]
+    _arrangement.cache_clear()
+    arrangement, t_cold = timed(arrange_drums, beats, downbeats, "rock")
+    _, t_memo = timed(arrange_drums, beats, downbeats, "rock")
+    kicks = arrangement["time"][arrangement["drum"] == 0]
+    # Fiecare downbeat are o lovitură de kick (umanizată cu câteva ms)
+    nearest = np.minimum(np.searchsorted(kicks, downbeats - 0.05), len(kicks) - 1)
+    offsets = np.abs(kicks[nearest] - downbeats)
+    passed = passed and bool(np.all(offsets < 0.05))
+    return {"case": "drums", "total": per_call, "arrange": t_cold, "arrange_memo": t_memo,
+            "hits": len(arrangement["time"]), "passed": passed}
+
+
+def read_note_on_seconds(data: bytes, track: int) -> np.ndarray:
+    """
+    Momentele (secunde, la redare) ale note-on-urilor unui track dintr-un SMF Type 1,
+    calculate din evenimentele Set Tempo ale track-ului 0 (verificare independentă de export)
+    """
+    division = int.from_bytes(data[12:14], "big")
+    chunks, pos = [], 14
+    while pos < len(data):
+        length = int.from_bytes(data[pos + 4:pos + 8], "big")
+        chunks.append(data[pos + 8:pos + 8 + length])
+        pos += 8 + length
+
+    def events(body):
+        i, tick = 0, 0
+        while i < len(body):
+            delta = 0
+            while True:
+                byte = body[i]
+                i += 1
+                delta = (delta << 7) | (byte & 0x7F)
+                if byte < 0x80:
+                    break
+            tick += delta
+            status = body[i]
+            if status == 0xFF:
+                kind, length = body[i + 1], body[i + 2]
+                yield tick, status, kind, body[i + 3:i + 3 + length]
+                i += 3 + length
+            elif status & 0xF0 in (0xC0, 0xD0):
+                i += 2
+            else:
+                yield tick, status, body[i + 1], body[i + 2]
+                i += 3
+
+    changes = [(tick, int.from_bytes(value, "big")) for tick, status, kind, value in events(chunks[0])
+               if status == 0xFF and kind == 0x51]
+    ticks = np.array([tick for tick, status, _, velocity in events(chunks[track])
+                      if status & 0xF0 == 0x90 and velocity > 0])
+    # Secundele la fiecare schimbare de tempo, apoi interpolare în porțiunea curentă
+    change_ticks = np.array([tick for tick, _ in changes])
+    usec = np.array([value for _, value in changes], dtype=float)
+    change_seconds = np.concatenate(([0.0], np.cumsum(np.diff(change_ticks) * usec[:-1] / division / 1e6)))
+    k = np.searchsorted(change_ticks, ticks, side="right") - 1
+    return change_seconds[k] + (ticks - change_ticks[k]) * usec[k] / division / 1e6
+
+
+def bench_midi(bars: int = 400) -> Dict[str, Any]:
+    """
+    Exportul MIDI pentru o piesă cu tempo variabil (100 -> 140 BPM) și ~10k evenimente:
+    timpul și debitul față de midiutil, plus eroarea de sincronizare la redare
+    """
+    import io
+
+    from midiutil import MIDIFile
+
+    from midi_export import DRUM_NOTES, chord_notes, merge_chords, render_karaoke_midi
+
+    n_beats = bars * 4
+    periods = 60.0 / np.linspace(100, 140, n_beats)
+    beats = 0.37 + np.concatenate(([0.0], np.cumsum(periods[:-1])))
+    names = ["C", "C", "G", "Am", "Am", "F#m7", "Bbmaj7", "C/E"]
+    # Un acord la două beat-uri, cu repetări (unite la export)
+    chords = [{"timp": float(beats[i]), "timp_final": float(beats[i + 2] if i + 2 < n_beats else beats[i] + 1),
+               "acord": names[(i // 2) % len(names)]} for i in range(0, n_beats, 2)]
+    analysis = {"title": "Synth", "tempo": 120.0, "chords": chords,
+                "beats": beats.tolist(), "downbeats": beats[::4].tolist()}
+    drums = arrange_drums(beats, beats[::4], "rock", 120.0)
+    spans = merge_chords(chords)
+    piano_notes = sum(len(chord_notes(name)[0]) for _, _, name in spans)
+    events = 2 * (piano_notes + len(spans) + len(drums["time"]))
+
+    data, t_render = timed(render_karaoke_midi, analysis, drums)
+    _, t_render = timed(render_karaoke_midi, analysis, drums)
+
+    def legacy():
+        midi = MIDIFile(3)
+        midi.addTempo(0, 0, 120.0)
+        for start, end, name in spans:
+            notes, bass = chord_notes(name)
+            for note in notes:
+                midi.addNote(0, 0, note, start * 2, (end - start) * 2, 80)
+            midi.addNote(1, 1, bass, start * 2, (end - start) * 2, 70)
+        for time_, drum, velocity in zip(drums["time"], drums["drum"], drums["velocity"]):
+            midi.addNote(2, 9, DRUM_NOTES[drums["drums"][drum]], time_ * 2, 0.25, int(velocity * 127))
+        buf = io.BytesIO()
+        midi.writeFile(buf)
+        return buf.getvalue()
+
+    _, t_legacy = timed(legacy)
+
+    played = read_note_on_seconds(data, 2)  # basul: o notă per interval de acord
+    error = float(np.max(np.abs(played - np.array([start for start, _, _ in spans]))))
+    return {"case": "midi", "total": t_render, "events": events, "legacy": t_legacy,
+            "chords": len(chords), "merged": len(spans), "sync_error_ms": error * 1000,
+            "passed": error < 0.002}
+
+
+def compare_baseline(results: List[Dict[str, Any]], path: str,
+                     tolerance: float = REGRESSION_TOLERANCE) -> List[str]:
+    """Cazurile mai lente decât în rezultatele de referință (--json dintr-o rulare anterioară)"""
+    import json
+
+    with open(path, encoding="utf-8") as f:
+        baseline = {case["case"]: case for case in json.load(f)["results"]}
+    slower = []
+    for case in results:
+        before = baseline.get(case["case"])
+        if before and case["total"] > before["total"] * tolerance:
+            slower.append(f"{case['case']}: {before['total']:.3f}s -> {case['total']:.3f}s")
+    return slower
+
+
+def bench_suite(durations: Optional[List[float]] = None, output: Optional[str] = None,
+                baseline: Optional[str] = None) -> bool:
+    """
+    Suita reproductibilă (fără rețea): cazurile SUITE_CASES, plus generarea percuției;
+    False dacă o verificare de corectitudine eșuează sau un caz a regresat față de baseline
+    """
+    import json
+    import platform
+
+    cases = [(s, b) for s, b in SUITE_CASES if durations is None or s in durations]
+    results = []
+    print("Suită de benchmark (audio sintetic, C-G-Am-F, click):")
+    for seconds, bpm in cases:
+        case = run_case(seconds, bpm)
+        results.append(case)
+        status = "✅" if case["passed"] else "❌"
+        stages = ", ".join(f"{name} {t:.2f}" for name, t in sorted(case["stages"].items(), key=lambda x: -x[1]))
+        print(f"   {status} {case['case']} ({case['path']}): {case['total']:.2f}s, "
+              f"{case['peak_mib']:.0f} MiB, acorduri {case['chord_accuracy']:.0%}, "
+              f"tempo {case['tempo']:.1f}, cheie {case['key']}")
+        print(f"      etape (s): {stages}")
+    drums = bench_drums()
+    results.append(drums)
+    print(f"   {'✅' if drums['passed'] else '❌'} percuție: {drums['total'] * 1e6:.1f} µs/măsură, "
+          f"aranjament {drums['hits']} lovituri: {drums['arrange'] * 1000:.1f} ms "
+          f"({drums['arrange_memo'] * 1000:.2f} ms memoizat)")
+
+    midi = bench_midi()
+    results.append(midi)
+    print(f"   {'✅' if midi['passed'] else '❌'} export MIDI: {midi['events']} evenimente în "
+          f"{midi['total'] * 1000:.1f} ms ({midi['events'] / midi['total'] / 1e6:.1f}M/s; "
+          f"midiutil {midi['legacy'] * 1000:.0f} ms), {midi['chords']} -> {midi['merged']} acorduri, "
+          f"eroare de sincronizare {midi['sync_error_ms']:.2f} ms")
+
+    ok = all(case["passed"] for case in results)
+    if baseline:
+        slower = compare_baseline(results, baseline)
+        for line in slower:
+            print(f"   ❌ regresie (> {REGRESSION_TOLERANCE:.2f}x): {line}")
+        ok = ok and not slower
+    if output:
+        with open(output, "w", encoding="utf-8") as f:
+            json.dump({"python": platform.python_version(), "machine": platform.machine(),
+                       "cpu_count": os.cpu_count(), "results": results}, f, indent=2)
+    return ok
+
+
+def import_time(module: str, runs: int = 3) -> Tuple[float, List[str]]:
+    """
+    Timpul de import cumulat (python -X importtime, minimul din runs procese noi)
+    și modulele DSP încărcate de import
+    """
+    code = f"import sys, {module}; print(','.join(m for m in {DSP_MODULES!r} if m in sys.modules))"
+    best, heavy = float("inf"), []
+    for _ in range(runs):
+        proc = subprocess.run([sys.executable, "-X", "importtime", "-c", code],
+                              capture_output=True, text=True, check=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__)))
+        for line in proc.stderr.splitlines():
+            parts = line.split("|")
+            if len(parts) == 3 and parts[2].strip() == module:
+                best = min(best, int(parts[1]) / 1e6)
+        heavy = [m for m in proc.stdout.strip().split(",") if m]
+    return best, heavy
+
+
+def bench_startup() -> bool:
+    """Timpul de import al aplicațiilor față de buget; False la regresie"""
+    ok = True
+    print("Pornire (python -X importtime):")
+    for module, budget in STARTUP_BUDGETS.items():
+        seconds, heavy = import_time(module)
+        passed = seconds <= budget and not heavy
+        ok = ok and passed
+        status = "✅" if passed else "❌"
+        extra = f", module DSP încărcate: {', '.join(heavy)}" if heavy else ""
+        print(f"   {status} import {module}: {seconds:.2f}s (buget {budget:.1f}s){extra}")
+    return ok
+
+
+def main_cli():
+    """Funcția principală"""
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Benchmark offline pentru analiza audio")
+    parser.add_argument("--seconds", type=float, default=60.0, help="Durata audio sintetic")
+    parser.add_argument("--startup", action="store_true",
+                        help="Doar timpul de pornire (cod de ieșire 1 la depășirea bugetului)")
+    parser.add_argument("--suite", action="store_true",
+                        help="Suita pe durate de la 30s la 60 min (cod de ieșire 1 la eșec)")
+    parser.add_argument("--durations", help="Doar aceste cazuri ale suitei (ex. 30,180)")
+    parser.add_argument("--json", help="Salvează rezultatele suitei (referință pentru --baseline)")
+    parser.add_argument("--baseline", help="Compară timpii suitei cu un fișier --json anterior")
+    args = parser.parse_args()
+
+    if args.startup:
+        exit(0 if bench_startup() else 1)
+
+    # Nucleele CQT și compilarea JIT nu intră în timpii măsurați (ca în server după pornire)
+    start = time.perf_counter()
+    warm_up()
+    print(f"🔥 Warm-up: {time.perf_counter() - start:.2f}s")
+    print()
+    if args.suite:
+        durations = [float(d) for d in args.durations.split(",")] if args.durations else None
+        exit(0 if bench_suite(durations, args.json, args.baseline) else 1)
+    print("🚀 Benchmark detectare acorduri")
+    print("=" * 50)
+    bench_chords(args.seconds)
+    print()
+    bench_rhythm(args.seconds)
+    print()
+    bench_pipeline(args.seconds)
+    print()
+    bench_resume(max(args.seconds, 60.0))
+    print()
+    bench_formats(max(args.seconds, 600.0))
+    print()
+    bench_startup()
+
+
+if __name__ == "__main__":
+    main_cli()
@@ -0,0 +1,332 @@
+"""
+Cache persistent (SQLite) pentru rezultatele analizei și fișierele audio, cu evacuare LRU și
+single-flight (în proces și între procesele serverului)
+"""
+
+import asyncio
+import json
+import os
+import shutil
+import sqlite3
+import tempfile
+import time
+import uuid
+from contextlib import contextmanager
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+# Versiunea parametrilor de analiză; se incrementează când se schimbă rezultatele (invalidează
+# cache-ul). Este aici, nu în analysis.py, ca cheile de cache să nu încarce librosa/numba.
+ANALYSIS_VERSION = "6"
+
+CACHE_DIR = os.environ.get("CACHE_DIR", os.path.join(tempfile.gettempdir(), "karaoke-cache"))
+CACHE_TTL = float(os.environ.get("CACHE_TTL", str(30 * 24 * 3600)))  # 30 de zile
+CACHE_MAX_MB = float(os.environ.get("CACHE_MAX_MB", "512"))
+# Spațiul pentru fișierele audio descărcate (0 dezactivează cache-ul media)
+MEDIA_CACHE_MB = float(os.environ.get("MEDIA_CACHE_MB", "2048"))
+# Spațiul pentru caracteristicile prefixelor analizate în modul preview
+FEATURE_CACHE_MB = float(os.environ.get("FEATURE_CACHE_MB", "256"))
+# Cât de des un proces care așteaptă job-ul altui proces verifică rezultatul (secunde)
+SHARED_FLIGHT_POLL = float(os.environ.get("SHARED_FLIGHT_POLL", "0.25"))
+# Durata lease-ului single-flight (secunde); procesul care rulează job-ul îl reînnoiește
+# periodic, deci un lease expiră repede doar dacă procesul a fost oprit
+SHARED_FLIGHT_LEASE = float(os.environ.get("SHARED_FLIGHT_LEASE", "30"))
+
+
+@contextmanager
+def connect(path: str, wal: bool = False):
+    """
+    Conexiune SQLite scurtă (autocommit, așteaptă până la 30s un lock), închisă la ieșire;
+    wal trece baza în modul WAL (la crearea schemei), pentru cititori și scriitori concurenți
+    """
+    conn = sqlite3.connect(path, timeout=30, isolation_level=None)
+    try:
+        if wal:
+            conn.execute("PRAGMA journal_mode=WAL")
+        yield conn
+    finally:
+        conn.close()
+
+
+class AnalysisCache:
+    """
+    Stocare cheie -> rezultat JSON pe disc; cheia este ID-ul video plus versiunea analizei
+    """
+
+    TABLE = "analysis"
+    VALUE_TYPE = "TEXT"
+
+    def __init__(self, path: Optional[str] = None, ttl: float = CACHE_TTL,
+                 max_bytes: int = int(CACHE_MAX_MB * 2**20)):
+        self.path = path or os.path.join(CACHE_DIR, "analysis.sqlite")
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        with connect(self.path, wal=True) as conn:
+            conn.execute(
+                f"CREATE TABLE IF NOT EXISTS {self.TABLE} ("
+                f" key TEXT PRIMARY KEY, value {self.VALUE_TYPE} NOT NULL, size INTEGER NOT NULL,"
+                " created REAL NOT NULL, accessed REAL NOT NULL)"
+            )
+            conn.execute(f"CREATE INDEX IF NOT EXISTS {self.TABLE}_accessed ON {self.TABLE}(accessed)")
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """Returnează rezultatul din cache sau None (lipsă sau expirat)"""
+        now = time.time()
+        with connect(self.path) as conn:
+            row = conn.execute(f"SELECT value, created FROM {self.TABLE} WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            if now - row[1] > self.ttl:
+                conn.execute(f"DELETE FROM {self.TABLE} WHERE key = ?", (key,))
+                return None
+            conn.execute(f"UPDATE {self.TABLE} SET accessed = ? WHERE key = ?", (now, key))
+        return self._decode(row[0])
+
+    def put(self, key: str, value: Dict[str, Any]):
+        """Salvează rezultatul și evacuează intrările cele mai vechi dacă se depășește limita"""
+        data = self._encode(value)
+        now = time.time()
+        with connect(self.path) as conn:
+            conn.execute(
+                f"INSERT OR REPLACE INTO {self.TABLE} (key, value, size, created, accessed)"
+                " VALUES (?, ?, ?, ?, ?)",
+                (key, data, len(data), now, now),
+            )
+            self._evict(conn, now)
+
+    def _evict(self, conn: sqlite3.Connection, now: float):
+        conn.execute(f"DELETE FROM {self.TABLE} WHERE created < ?", (now - self.ttl,))
+        total = conn.execute(f"SELECT COALESCE(SUM(size), 0) FROM {self.TABLE}").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        victims = []
+        for key, size in conn.execute(f"SELECT key, size FROM {self.TABLE} ORDER BY accessed ASC"):
+            if total <= self.max_bytes:
+                break
+            victims.append((key,))
+            total -= size
+        conn.executemany(f"DELETE FROM {self.TABLE} WHERE key = ?", victims)
+
+    def _encode(self, value: Dict[str, Any]):
+        return json.dumps(value, ensure_ascii=False)
+
+    def _decode(self, data) -> Dict[str, Any]:
+        return json.loads(data)
+
+    def __contains__(self, key: str) -> bool:
+        return self.get(key) is not None
+
+
+class FeatureCache(AnalysisCache):
+    """
+    Caracteristicile de frame ale unui prefix (chroma, onset) după modul preview,
+    refolosite de analiza completă a aceleiași piese; stocate ca .npz în SQLite
+    """
+
+    TABLE = "features"
+    VALUE_TYPE = "BLOB"
+
+    def __init__(self, path: Optional[str] = None, ttl: float = CACHE_TTL,
+                 max_bytes: int = int(FEATURE_CACHE_MB * 2**20)):
+        super().__init__(path or os.path.join(CACHE_DIR, "features.sqlite"), ttl, max_bytes)
+
+    def _encode(self, value: Dict[str, Any]) -> bytes:
+        import io
+        import numpy as np
+
+        buf = io.BytesIO()
+        np.savez(buf, **{name: np.asarray(item) for name, item in value.items()})
+        return buf.getvalue()
+
+    def _decode(self, data: bytes) -> Dict[str, Any]:
+        import io
+        import numpy as np
+
+        with np.load(io.BytesIO(data)) as npz:
+            return {name: npz[name] if npz[name].ndim else npz[name].item() for name in npz.files}
+
+
+class MediaCache:
+    """
+    Fișierele audio descărcate, pe disc, după ID-ul videoclipului (evacuare LRU după dimensiune)
+
+    Indexul SQLite păstrează și metadatele necesare analizei (titlu, durată), astfel încât
+    o re-analiză (ex. după schimbarea ANALYSIS_VERSION) nu mai descarcă nimic.
+    """
+
+    def __init__(self, directory: Optional[str] = None, max_bytes: int = int(MEDIA_CACHE_MB * 2**20)):
+        self.directory = directory or os.path.join(CACHE_DIR, "media")
+        self.path = os.path.join(self.directory, "media.sqlite")
+        self.max_bytes = max_bytes
+        os.makedirs(self.directory, exist_ok=True)
+        with connect(self.path, wal=True) as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS media ("
+                " key TEXT PRIMARY KEY, filename TEXT NOT NULL, info TEXT NOT NULL,"
+                " size INTEGER NOT NULL, created REAL NOT NULL, accessed REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS media_accessed ON media(accessed)")
+
+    def get(self, key: str) -> Optional[Tuple[Dict[str, Any], str]]:
+        """Returnează (info, calea fișierului) sau None"""
+        with connect(self.path) as conn:
+            row = conn.execute("SELECT filename, info FROM media WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            path = os.path.join(self.directory, row[0])
+            if not os.path.exists(path):
+                conn.execute("DELETE FROM media WHERE key = ?", (key,))
+                return None
+            conn.execute("UPDATE media SET accessed = ? WHERE key = ?", (time.time(), key))
+        return json.loads(row[1]), path
+
+    def put(self, key: str, info: Dict[str, Any], audio_path: str) -> str:
+        """Mută fișierul descărcat în cache și returnează noua cale"""
+        filename = key + os.path.splitext(audio_path)[1]
+        path = os.path.join(self.directory, filename)
+        # Copie sub un nume temporar, apoi redenumire atomică (alte procese pot citi intrarea)
+        fd, partial = tempfile.mkstemp(dir=self.directory, suffix=".part")
+        os.close(fd)
+        shutil.move(audio_path, partial)
+        os.replace(partial, path)
+
+        now = time.time()
+        with connect(self.path) as conn:
+            old = conn.execute("SELECT filename FROM media WHERE key = ?", (key,)).fetchone()
+            if old is not None and old[0] != filename:
+                try:
+                    os.remove(os.path.join(self.directory, old[0]))
+                except FileNotFoundError:
+                    pass
+            conn.execute(
+                "INSERT OR REPLACE INTO media (key, filename, info, size, created, accessed)"
+                " VALUES (?, ?, ?, ?, ?, ?)",
+                (key, filename, json.dumps(info, ensure_ascii=False), os.path.getsize(path), now, now),
+            )
+            self._evict(conn, key)
+        return path
+
+    def _evict(self, conn: sqlite3.Connection, keep: str):
+        total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM media").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        victims = []
+        for key, filename, size in conn.execute(
+            "SELECT key, filename, size FROM media WHERE key != ? ORDER BY accessed ASC", (keep,)
+        ):
+            if total <= self.max_bytes:
+                break
+            victims.append((key, filename))
+            total -= size
+        for key, filename in victims:
+            try:
+                os.remove(os.path.join(self.directory, filename))
+            except FileNotFoundError:
+                pass
+        conn.executemany("DELETE FROM media WHERE key = ?", [(key,) for key, _ in victims])
+
+    def __contains__(self, key: str) -> bool:
+        return self.get(key) is not None
+
+
+class SingleFlight:
+    """
+    Cereri concurente pentru aceeași cheie așteaptă același job în loc să pornească duplicate
+    """
+
+    def __init__(self):
+        self._inflight: Dict[str, asyncio.Future] = {}
+
+    async def run(self, key: str, factory: Callable[[], Awaitable[Any]]) -> Any:
+        future = self._inflight.get(key)
+        if future is None:
+            future = asyncio.ensure_future(factory())
+            self._inflight[key] = future
+            future.add_done_callback(lambda _: self._inflight.pop(key, None))
+            # Eroarea ajunge la cei care așteaptă; fără ei (clienți deconectați) nu se mai loghează
+            future.add_done_callback(lambda f: f.cancelled() or f.exception())
+        # shield: deconectarea unui client nu anulează job-ul pentru ceilalți
+        return await asyncio.shield(future)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._inflight
+
+
+class SharedFlight(SingleFlight):
+    """
+    SingleFlight între procese (worker-ele gunicorn): procesul care obține lease-ul SQLite
+    al cheii rulează job-ul, celelalte așteaptă rezultatul în cache-ul comun
+
+    Lease-ul este scurt și reînnoit cât timp job-ul rulează; un lease expirat (proces oprit
+    în timpul job-ului) poate fi preluat. Dacă job-ul eșuează, lease-ul este eliberat și
+    următorul proces care așteaptă îl rulează el însuși. Apelurile SQLite rulează în thread-uri,
+    în afara event loop-ului.
+    """
+
+    def __init__(self, path: str, lease_seconds: float = SHARED_FLIGHT_LEASE, poll: float = SHARED_FLIGHT_POLL):
+        super().__init__()
+        self.path = path
+        self.lease_seconds = lease_seconds
+        self.poll = poll
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        with connect(self.path, wal=True) as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS leases ("
+                " key TEXT PRIMARY KEY, owner TEXT NOT NULL, expires REAL NOT NULL)"
+            )
+
+    def _acquire(self, key: str, owner: str) -> bool:
+        now = time.time()
+        with connect(self.path) as conn:
+            conn.execute("DELETE FROM leases WHERE key = ? AND expires < ?", (key, now))
+            cursor = conn.execute("INSERT OR IGNORE INTO leases (key, owner, expires) VALUES (?, ?, ?)",
+                                  (key, owner, now + self.lease_seconds))
+            return cursor.rowcount == 1
+
+    def _renew(self, key: str, owner: str):
+        with connect(self.path) as conn:
+            conn.execute("UPDATE leases SET expires = ? WHERE key = ? AND owner = ?",
+                         (time.time() + self.lease_seconds, key, owner))
+
+    def _release(self, key: str, owner: str):
+        with connect(self.path) as conn:
+            conn.execute("DELETE FROM leases WHERE key = ? AND owner = ?", (key, owner))
+
+    def _held(self, key: str) -> bool:
+        with connect(self.path) as conn:
+            row = conn.execute("SELECT 1 FROM leases WHERE key = ? AND expires >= ?",
+                               (key, time.time())).fetchone()
+        return row is not None
+
+    async def run(self, key: str, factory: Callable[[], Awaitable[Any]],
+                  lookup: Callable[[], Optional[Any]] = lambda: None) -> Any:
+        """
+        Ca SingleFlight.run; lookup() citește rezultatul stocat de job (None dacă lipsește)
+        și rulează într-un thread
+        """
+        async def heartbeat(owner: str):
+            while True:
+                await asyncio.sleep(self.lease_seconds / 3)
+                await asyncio.to_thread(self._renew, key, owner)
+
+        async def leader_or_follower():
+            owner = f"{os.getpid()}:{uuid.uuid4().hex}"
+            while True:
+                if await asyncio.to_thread(self._acquire, key, owner):
+                    renew = asyncio.ensure_future(heartbeat(owner))
+                    try:
+                        return await factory()
+                    finally:
+                        renew.cancel()
+                        await asyncio.to_thread(self._release, key, owner)
+                # Alt proces rulează job-ul: rezultatul apare în cache sau lease-ul dispare
+                while await asyncio.to_thread(self._held, key):
+                    await asyncio.sleep(self.poll)
+                    result = await asyncio.to_thread(lookup)
+                    if result is not None:
+                        return result
+                result = await asyncio.to_thread(lookup)
+                if result is not None:
+                    return result
+
+        return await super().run(key, leader_or_follower)
@@ -0,0 +1,291 @@
+"""
+Descărcarea audio din YouTube (yt_dlp), cu cache media și limite de durată
+"""
+
+import hashlib
+import math
+import os
+import re
+import shutil
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, urlparse
+
+from cache import MEDIA_CACHE_MB, MediaCache
+from metrics import CACHE_REQUESTS, inc
+
+# "pipe": fișierul nativ (opus/m4a) este decodat direct prin ffmpeg în NumPy;
+# "wav": transcodare FFmpegExtractAudio în WAV (comportamentul vechi)
+DECODE_MODE = os.environ.get("DECODE_MODE", "pipe")
+
+# Durata maximă acceptată (secunde, 0 = fără limită) și ce se întâmplă peste ea:
+# "reject" refuză videoclipul, "truncate" descarcă doar primele MAX_DURATION secunde
+MAX_DURATION = float(os.environ.get("MAX_DURATION", str(3 * 3600)))
+DURATION_POLICY = os.environ.get("DURATION_POLICY", "reject")
+# Bitrate-ul audio minim (kbps) considerat suficient pentru analiza mono la 22 kHz;
+# se alege cel mai mic format audio peste el, nu cel mai bun
+MIN_AUDIO_ABR = int(os.environ.get("MIN_AUDIO_ABR", "48"))
+# "yt_dlp" sau "fixtures" (fișiere locale din MEDIA_FIXTURES_DIR, fără rețea)
+MEDIA_EXTRACTOR = os.environ.get("MEDIA_EXTRACTOR", "yt_dlp")
+MEDIA_FIXTURES_DIR = os.environ.get("MEDIA_FIXTURES_DIR", "fixtures")
+
+# Metadatele yt_dlp păstrate în cache-ul media (restul dicționarului info nu e folosit)
+_INFO_FIELDS = ("id", "title", "duration", "ext", "abr", "format_id", "webpage_url")
+
+
+class DurationError(ValueError):
+    """Videoclipul depășește durata maximă acceptată (sau este o transmisiune live)"""
+
+
+def audio_format(min_abr: int = MIN_AUDIO_ABR) -> str:
+    """Selectorul yt_dlp: cel mai mic format audio cu bitrate cel puțin min_abr kbps"""
+    return f"worstaudio[abr>={min_abr}]/bestaudio/best"
+
+
+class FixtureExtractor:
+    """
+    Înlocuitor local pentru yt_dlp.YoutubeDL (teste și load test, fără rețea)
+
+    Servește fișierele audio din directorul de fixture-uri: <id>.<ext> pentru ID-ul
+    videoclipului, cu metadate opționale în <id>.json; celelalte ID-uri primesc
+    deterministic unul dintre fișiere. Implementează doar ce folosește DownloadManager.
+    """
+
+    AUDIO_EXTENSIONS = (".wav", ".flac", ".ogg", ".opus", ".m4a", ".mp3", ".webm")
+
+    def __init__(self, params: Dict[str, Any], directory: Optional[str] = None):
+        self.params = params
+        self.directory = directory or MEDIA_FIXTURES_DIR
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def _fixtures(self) -> List[str]:
+        if not os.path.isdir(self.directory):
+            return []
+        return sorted(
+            os.path.join(self.directory, name) for name in os.listdir(self.directory)
+            if os.path.splitext(name)[1].lower() in self.AUDIO_EXTENSIONS
+        )
+
+    def extract_info(self, url: str, download: bool = False) -> Dict[str, Any]:
+        import json
+
+        video_id = media_key(url)
+        fixtures = self._fixtures()
+        if not fixtures:
+            raise FileNotFoundError(f"Niciun fișier audio în {self.directory}")
+        by_id = {os.path.splitext(os.path.basename(path))[0]: path for path in fixtures}
+        digest = int(hashlib.sha256(video_id.encode()).hexdigest(), 16)
+        path = by_id.get(video_id) or fixtures[digest % len(fixtures)]
+
+        info = {"id": video_id, "title": video_id, "ext": os.path.splitext(path)[1][1:],
+                "webpage_url": url, "_fixture": path}
+        meta = os.path.splitext(path)[0] + ".json"
+        if os.path.exists(meta):
+            with open(meta, encoding="utf-8") as f:
+                info.update(json.load(f))
+        if "duration" not in info:
+            try:
+                import soundfile as sf
+
+                info["duration"] = sf.info(path).duration
+            except Exception:
+                info["duration"] = None
+        return info
+
+    def prepare_filename(self, info: Dict[str, Any]) -> str:
+        return self.params["outtmpl"] % {"ext": info["ext"]}
+
+    def process_ie_result(self, info: Dict[str, Any], download: bool = True) -> Dict[str, Any]:
+        path = self.prepare_filename(info)
+        shutil.copyfile(info["_fixture"], path)
+        size = os.path.getsize(path)
+        for hook in self.params.get("progress_hooks", []):
+            hook({"status": "downloading", "downloaded_bytes": size, "total_bytes": size})
+            hook({"status": "finished", "downloaded_bytes": size, "total_bytes": size})
+        return {**info, "requested_downloads": [{"filepath": path}]}
+
+
+class DownloadManager:
+    """
+    Descărcări prin yt_dlp (sau un extractor compatibil), cu cache media după ID-ul
+    videoclipului, format audio minim suficient și verificarea duratei înainte de descărcare
+    """
+
+    def __init__(self, cache: Optional[MediaCache] = None, max_duration: float = MAX_DURATION,
+                 duration_policy: str = DURATION_POLICY, min_abr: int = MIN_AUDIO_ABR,
+                 extractor: Optional[Callable[[Dict[str, Any]], Any]] = None):
+        self.cache = cache
+        self.max_duration = max_duration
+        self.duration_policy = duration_policy
+        self.min_abr = min_abr
+        self.extractor = extractor
+
+    def _open(self, opts: Dict[str, Any]):
+        if self.extractor is not None:
+            return self.extractor(opts)
+        if MEDIA_EXTRACTOR == "fixtures":
+            return FixtureExtractor(opts)
+        # Import târziu: extract_video_id/cache_key rămân disponibile fără yt_dlp încărcat
+        import yt_dlp
+
+        return yt_dlp.YoutubeDL(opts)
+
+    def duration_limit(self, info: Dict[str, Any]) -> Optional[float]:
+        """
+        Limita de trunchiere (secunde) pentru videoclip sau None dacă încape;
+        ridică DurationError dacă trebuie refuzat
+        """
+        if info.get("is_live"):
+            raise DurationError("Transmisiunile live nu pot fi analizate")
+        duration = info.get("original_duration") or info.get("duration") or 0
+        if self.max_duration <= 0 or duration <= self.max_duration:
+            return None
+        if self.duration_policy == "truncate":
+            return self.max_duration
+        raise DurationError(
+            f"Videoclipul are {duration / 60:.1f} minute; limita este {self.max_duration / 60:.1f} minute"
+        )
+
+    def download(self, url: str, tmpdir: str,
+                 progress: Optional[Callable[[str, float], None]] = None,
+                 on_info: Optional[Callable[[Dict[str, Any]], None]] = None,
+                 max_seconds: Optional[float] = None) -> Tuple[Dict[str, Any], str]:
+        """
+        Returnează (info, calea fișierului audio): din cache-ul media sau descărcat în tmpdir
+
+        progress("downloading", percent) primește procentul descărcării scalat la 0-40;
+        on_info(info) este apelat cu metadatele înainte să înceapă descărcarea.
+        Cu max_seconds (modul preview) se descarcă doar prefixul, care nu intră în cache;
+        un fișier complet aflat deja în cache este returnat ca atare.
+        """
+        key = media_key(url)
+        cached = self.cache.get(key) if self.cache is not None else None
+        if cached is not None:
+            info, path = cached
+            # Intrarea e valabilă doar dacă a fost trunchiată la fel ca acum
+            if self.duration_limit(info) == info.get("truncated_at"):
+                inc(CACHE_REQUESTS, cache="media", result="hit")
+                if on_info:
+                    on_info(info)
+                if progress:
+                    progress("downloading", 40)
+                return info, path
+        if self.cache is not None:
+            inc(CACHE_REQUESTS, cache="media", result="miss")
+
+        def hook(d):
+            total = d.get("total_bytes") or d.get("total_bytes_estimate")
+            if progress and d.get("status") == "downloading" and total:
+                progress("downloading", 40 * d.get("downloaded_bytes", 0) / total)
+
+        ydl_opts = {
+            'format': audio_format(self.min_abr),
+            'outtmpl': f'{tmpdir}/audio.%(ext)s',
+            'quiet': True,
+            'no_warnings': True,
+            'progress_hooks': [hook],
+        }
+        if DECODE_MODE == "wav":
+            ydl_opts['postprocessors'] = [{
+                'key': 'FFmpegExtractAudio',
+                'preferredcodec': 'wav',
+                'preferredquality': '192',
+            }]
+
+        with self._open(ydl_opts) as ydl:
+            full_info = ydl.extract_info(url, download=False)
+            limit = self.duration_limit(full_info)
+            info = {field: full_info.get(field) for field in _INFO_FIELDS}
+            if limit is not None:
+                info.update(truncated_at=limit, original_duration=info["duration"], duration=limit)
+            section = min(x for x in (limit, max_seconds, info["duration"] or math.inf) if x)
+            prefix_only = max_seconds is not None and section < (info["duration"] or math.inf)
+            if section < (info.get("original_duration") or info["duration"] or math.inf):
+                from yt_dlp.utils import download_range_func
+
+                # Doar primele `section` secunde (descărcare pe secțiuni, prin ffmpeg)
+                ydl.params['download_ranges'] = download_range_func(None, [(0, section)])
+            if on_info:
+                on_info(info)
+
+            full_info = ydl.process_ie_result(full_info, download=True)
+            wav_path = os.path.join(tmpdir, "audio.wav")
+            if DECODE_MODE == "wav" and os.path.exists(wav_path):
+                path = wav_path
+            else:
+                downloads = full_info.get("requested_downloads") or [{}]
+                path = downloads[0].get("filepath") or ydl.prepare_filename(full_info)
+            info.update(ext=os.path.splitext(path)[1][1:], abr=full_info.get("abr"),
+                        format_id=full_info.get("format_id"))
+
+        if self.cache is not None and not prefix_only:
+            path = self.cache.put(key, info, path)
+        return info, path
+
+
+download_manager = DownloadManager(cache=MediaCache() if MEDIA_CACHE_MB > 0 else None)
+
+
+def download_audio(url: str, tmpdir: str,
+                   progress: Optional[Callable[[str, float], None]] = None,
+                   on_info: Optional[Callable[[Dict[str, Any]], None]] = None,
+                   max_seconds: Optional[float] = None) -> Tuple[Dict[str, Any], str]:
+    """
+    Descarcă audio-ul (sau îl ia din cache-ul media) și returnează (info, calea fișierului audio)
+
+    În modul "pipe" fișierul rămâne în formatul nativ (fără WAV intermediar).
+    """
+    return download_manager.download(url, tmpdir, progress, on_info, max_seconds)
+
+
+_VIDEO_ID_RE = re.compile(r"^[A-Za-z0-9_-]{11}$")
+
+
+def extract_video_id(url: str) -> Optional[str]:
+    """
+    ID-ul canonic al videoclipului YouTube (youtu.be, watch?v=, shorts, embed, live)
+
+    Parametrii suplimentari (&t=, &list=, ...) sunt ignorați; pentru URL-uri
+    necunoscute returnează None.
+    """
+    url = url.strip()
+    if _VIDEO_ID_RE.match(url):
+        return url
+
+    parsed = urlparse(url if "//" in url else f"https://{url}")
+    host = (parsed.hostname or "").lower()
+    if host.startswith("www."):
+        host = host[4:]
+
+    candidate = None
+    if host == "youtu.be":
+        candidate = parsed.path.lstrip("/").split("/")[0]
+    elif host.endswith("youtube.com") or host.endswith("youtube-nocookie.com"):
+        parts = [p for p in parsed.path.split("/") if p]
+        if parts and parts[0] == "watch":
+            candidate = parse_qs(parsed.query).get("v", [None])[0]
+        elif len(parts) >= 2 and parts[0] in ("shorts", "embed", "live", "v", "e"):
+            candidate = parts[1]
+
+    if candidate and _VIDEO_ID_RE.match(candidate):
+        return candidate
+    return None
+
+
+def media_key(url: str) -> str:
+    """ID-ul video sau, pentru alte URL-uri, un hash stabil al URL-ului"""
+    video_id = extract_video_id(url)
+    if video_id is None:
+        video_id = "url-" + hashlib.sha256(url.strip().encode()).hexdigest()[:16]
+    return video_id
+
+
+def cache_key(url: str, version: str) -> str:
+    """
+    Cheia de cache: ID-ul video (sau hash-ul URL-ului) plus versiunea parametrilor de analiză
+    """
+    return f"{media_key(url)}:{version}"
@@ -0,0 +1,179 @@
+"""
+Generarea percuției: pattern-ul unei măsuri (fără dependențe DSP) și aranjamentul pe toată
+piesa, aliniat la beat-urile detectate (NumPy, importat doar de aranjor)
+"""
+
+import math
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Sequence
+
+BEATS_PER_BAR = 4
+# Rezoluția grilei aranjorului: șaisprezecimi
+STEPS_PER_BEAT = 4
+
+# Instrumentele (ordinea dă indicii din coloana "drum") și velocity-ul lor implicit
+DRUMS = ("kick", "snare", "hihat", "crash", "tom1", "tom2", "tom3")
+DRUM_VELOCITY = {"kick": 0.8, "snare": 0.7, "hihat": 0.5, "crash": 0.9,
+                 "tom1": 0.75, "tom2": 0.75, "tom3": 0.75}
+
+# Pattern-urile de bază (o măsură 4/4): pozițiile loviturilor în beat-uri, per instrument
+PATTERNS = {
+    "rock": {
+        "kick": [0, 2],  # Beat-uri 1 și 3
+        "snare": [1, 3],  # Beat-uri 2 și 4
+        "hihat": [0, 0.5, 1, 1.5, 2, 2.5, 3, 3.5]  # 8th notes
+    },
+    "pop": {
+        "kick": [0, 1.5, 2, 3.5],
+        "snare": [1, 3],
+        "hihat": [0, 0.5, 1, 1.5, 2, 2.5, 3, 3.5]
+    },
+    "jazz": {
+        "kick": [0, 2.5],
+        "snare": [1, 3],
+        "hihat": [0, 0.25, 0.5, 0.75, 1, 1.25, 1.5, 1.75, 2, 2.25, 2.5, 2.75, 3, 3.25, 3.5, 3.75]
+    },
+    "electronic": {
+        "kick": [0, 1, 2, 3],
+        "snare": [1, 3],
+        "hihat": [0, 0.25, 0.5, 0.75, 1, 1.25, 1.5, 1.75, 2, 2.25, 2.5, 2.75, 3, 3.25, 3.5, 3.75]
+    }
+}
+
+# Fill-urile din ultima măsură a unei secțiuni: înlocuiesc pattern-ul de la FILL_START beat-uri
+FILL_START = 2
+FILLS = {
+    "rock": {"kick": [2], "snare": [2.5, 2.75, 3], "tom2": [3.25, 3.5], "tom1": [3.75]},
+    "pop": {"kick": [2], "snare": [2.5, 3, 3.25, 3.5, 3.75]},
+    "jazz": {"snare": [2.5, 3], "tom3": [3.25], "tom2": [3.5], "tom1": [3.75]},
+    "electronic": {"kick": [2, 3], "snare": [2, 2.25, 2.5, 2.75, 3, 3.25, 3.5, 3.75]},
+}
+
+# Secțiuni de FILL_EVERY_BARS măsuri: fill la final, crash pe primul timp al următoarei
+FILL_EVERY_BARS = 8
+# Umanizare: deviația standard a velocity-ului și a momentului loviturii (milisecunde)
+HUMANIZE_VELOCITY = 0.06
+HUMANIZE_MS = 8.0
+
+# O măsură per stil, sortată după poziție: (beat, instrument, velocity)
+_MEASURES = {
+    style: sorted(((beat, drum, DRUM_VELOCITY[drum])
+                   for drum in ("kick", "snare", "hihat") for beat in pattern[drum]),
+                  key=lambda hit: hit[0])
+    for style, pattern in PATTERNS.items()
+}
+
+
+def generate_drum_pattern(tempo: float, style: str = "rock") -> List[Dict[str, Any]]:
+    """
+    Generează pattern-uri de percuție sincronizate cu tempo-ul
+    """
+    # Calculează durata unui beat (4/4 time)
+    beat_duration = 60.0 / tempo  # secunde per beat
+    return [
+        {"time": beat * beat_duration, "drum": drum, "velocity": velocity}
+        for beat, drum, velocity in _MEASURES.get(style, _MEASURES["rock"])
+    ]
+
+
+@lru_cache(maxsize=None)
+def _step_library():
+    """
+    Pattern-urile și fill-urile compilate ca matrice de pași (instrumente x pași pe măsură,
+    valoarea = velocity, 0 = fără lovitură), o singură dată per proces
+    """
+    import numpy as np
+
+    def compile_steps(hits: Dict[str, List[float]]):
+        steps = np.zeros((len(DRUMS), BEATS_PER_BAR * STEPS_PER_BEAT), dtype=np.float32)
+        for drum, beats in hits.items():
+            steps[DRUMS.index(drum), (np.asarray(beats) * STEPS_PER_BEAT).astype(int)] = DRUM_VELOCITY[drum]
+        return steps
+
+    return {style: (compile_steps(PATTERNS[style]), compile_steps(FILLS[style])) for style in PATTERNS}
+
+
+@lru_cache(maxsize=256)
+def _arrangement(tempo: float, style: str, bars: int, fill_every: int, seed: int):
+    """
+    Aranjamentul în beat-uri de la prima măsură: (poziție, instrument, velocity), sortat
+    după poziție; nu depinde de grila reală, deci este memoizat după (tempo, stil, măsuri)
+    """
+    import numpy as np
+
+    groove, fill = _step_library()[style]
+    steps = groove.shape[1]
+    score = np.tile(groove, (1, bars))
+
+    # Fill în ultima măsură a fiecărei secțiuni, crash la începutul secțiunii următoare
+    if fill_every > 0:
+        fill_bars = np.arange(fill_every - 1, bars - 1, fill_every)
+        columns = (fill_bars[:, None] * steps + np.arange(FILL_START * STEPS_PER_BEAT, steps)).ravel()
+        score[:, columns] = np.tile(fill[:, FILL_START * STEPS_PER_BEAT:], (1, len(fill_bars)))
+        section_starts = np.append(0, (fill_bars + 1) * steps)
+        score[DRUMS.index("crash"), section_starts] = DRUM_VELOCITY["crash"]
+        score[DRUMS.index("hihat"), section_starts] = 0
+
+    step, drum = np.nonzero(score.T)
+    velocity = score[drum, step]
+
+    # Umanizare deterministă (seed): abatere de timp în beat-uri la tempo-ul dat
+    rng = np.random.default_rng(seed)
+    jitter = rng.normal(0.0, HUMANIZE_MS / 1000 * tempo / 60, len(step))
+    position = np.maximum(step / STEPS_PER_BEAT + jitter, 0.0)
+    velocity = np.clip(velocity + rng.normal(0.0, HUMANIZE_VELOCITY, len(step)), 0.05, 1.0)
+
+    arrays = (position, drum.astype(np.uint8), velocity.astype(np.float32))
+    for array in arrays:
+        array.setflags(write=False)
+    return arrays
+
+
+def arrange_drums(beats: Sequence[float], downbeats: Optional[Sequence[float]] = None,
+                  style: str = "rock", tempo: Optional[float] = None,
+                  duration: Optional[float] = None, fill_every: int = FILL_EVERY_BARS,
+                  seed: int = 0) -> Dict[str, Any]:
+    """
+    Percuția pentru toată piesa, aliniată la beat-urile și măsurile detectate
+
+    Pattern-ul stilului este repetat pe grila de pași (operații pe array-uri), cu fill-uri
+    la sfârșitul secțiunilor și velocity umanizat, apoi pozițiile (în beat-uri) sunt mapate
+    pe timpii reali ai beat-urilor, deci urmăresc variațiile de tempo. Returnează coloanele
+    time (secunde), drum (index în DRUMS) și velocity.
+    """
+    import numpy as np
+
+    beats = np.asarray(beats, dtype=float)
+    if len(beats) < 2:
+        raise ValueError("Sunt necesare cel puțin două beat-uri")
+    if style not in PATTERNS:
+        style = "rock"
+    period = float(np.median(np.diff(beats)))
+    tempo = round(tempo or 60.0 / period, 1)
+
+    # Prima măsură începe la primul downbeat; beat-urile de dinainte (anacruza) rămân fără percuție
+    first = int(np.searchsorted(beats, downbeats[0] - 1e-6)) if downbeats is not None and len(downbeats) else 0
+    grid = beats[first:]
+    bars = max(1, math.ceil(len(grid) / BEATS_PER_BAR))
+    # Grila prelungită cu tempo-ul median până la sfârșitul ultimei măsuri
+    missing = bars * BEATS_PER_BAR + 1 - len(grid)
+    if missing > 0:
+        grid = np.append(grid, grid[-1] + period * np.arange(1, missing + 1))
+
+    position, drum, velocity = _arrangement(tempo, style, bars, fill_every, seed)
+    time = np.interp(position, np.arange(len(grid)), grid)
+    if duration:
+        keep = time < duration
+        time, drum, velocity = time[keep], drum[keep], velocity[keep]
+    return {"style": style, "tempo": tempo, "bars": bars, "drums": DRUMS,
+            "time": time, "drum": drum, "velocity": velocity}
+
+
+def drum_hits(arrangement: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Aranjamentul ca listă de lovituri {"time", "drum", "velocity"} (JSON, export MIDI)"""
+    names = arrangement["drums"]
+    return [
+        {"time": round(time, 4), "drum": names[drum], "velocity": round(velocity, 3)}
+        for time, drum, velocity in zip(arrangement["time"].tolist(), arrangement["drum"].tolist(),
+                                        arrangement["velocity"].tolist())
+    ]
@@ -0,0 +1,159 @@
+"""
+Formate de răspuns pentru rezultatul analizei: JSON, msgpack sau .npz (structure-of-arrays),
+negociate prin Accept, cu compresie gzip/br negociată prin Accept-Encoding
+"""
+
+import gzip
+import io
+import json
+import os
+from typing import Any, Dict, Optional, Tuple
+
+from fastapi import Response
+
+JSON = "application/json"
+MSGPACK = "application/msgpack"
+NPZ = "application/x-npz"
+
+_MEDIA_TYPES = {
+    "application/json": JSON,
+    "application/msgpack": MSGPACK,
+    "application/x-msgpack": MSGPACK,
+    "application/x-npz": NPZ,
+    "*/*": JSON,
+}
+
+# Versiunea schemei structure-of-arrays; se incrementează la schimbări incompatibile
+COLUMNAR_FORMAT = "karaoke-soa/1"
+# Răspunsurile mai mici nu se comprimă (câștig neglijabil, cost CPU)
+COMPRESS_MIN_BYTES = int(os.environ.get("COMPRESS_MIN_BYTES", "1024"))
+
+_META_FIELDS = ("title", "tempo", "duration", "key", "mode", "key_confidence",
+                "chord_progression", "difficulty", "partial")
+
+
+def _parse_header(value: Optional[str]):
+    """(token, q) pentru fiecare element dintr-un header Accept / Accept-Encoding"""
+    for part in (value or "").split(","):
+        fields = part.strip().split(";")
+        token = fields[0].strip().lower()
+        if not token:
+            continue
+        q = 1.0
+        for param in fields[1:]:
+            name, _, number = param.partition("=")
+            if name.strip() == "q":
+                try:
+                    q = float(number)
+                except ValueError:
+                    q = 0.0
+        yield token, q
+
+
+def negotiate(accept: Optional[str]) -> str:
+    """Formatul preferat de client (după q); implicit JSON"""
+    best, best_q = JSON, 0.0
+    for token, q in _parse_header(accept):
+        if token in _MEDIA_TYPES and q > best_q:
+            best, best_q = _MEDIA_TYPES[token], q
+    return best
+
+
+def columnar(result: Dict[str, Any]) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+    """
+    Rezultatul ca (metadate, coloane NumPy): vocabular de acorduri plus indici uint8,
+    timpi float32 și confidence float16, în loc de liste de dicționare
+    """
+    import numpy as np
+
+    chords = result.get("chords") or []
+    names = sorted({c["acord"] for c in chords})
+    index = {name: i for i, name in enumerate(names)}
+    curve = result.get("tempo_curve") or []
+    n = len(chords)
+
+    meta = {field: result.get(field) for field in _META_FIELDS}
+    meta["format"] = COLUMNAR_FORMAT
+    meta["chord_names"] = names
+    columns = {
+        "chord_index": np.fromiter((index[c["acord"]] for c in chords),
+                                   np.uint8 if len(names) <= 256 else np.uint16, n),
+        "chord_start": np.fromiter((c["timp"] for c in chords), np.float32, n),
+        "chord_end": np.fromiter((c.get("timp_final", c["timp"] + c.get("segment_duration", 0.0))
+                                  for c in chords), np.float32, n),
+        "chord_confidence": np.fromiter((c.get("confidence", 0.0) for c in chords), np.float16, n),
+        "beats": np.asarray(result.get("beats") or [], dtype=np.float32),
+        "downbeats": np.asarray(result.get("downbeats") or [], dtype=np.float32),
+        "tempo_curve_time": np.fromiter((p["timp"] for p in curve), np.float32, len(curve)),
+        "tempo_curve_bpm": np.fromiter((p["tempo"] for p in curve), np.float32, len(curve)),
+    }
+    return meta, columns
+
+
+def encode_msgpack(result: Dict[str, Any]) -> bytes:
+    """
+    msgpack: metadatele ca atare, coloanele ca bytes little-endian; tipul fiecărei
+    coloane este în "dtypes" (ex. np.frombuffer(payload["beats"], payload["dtypes"]["beats"]))
+    """
+    import msgpack
+
+    meta, columns = columnar(result)
+    meta["dtypes"] = {name: column.dtype.str for name, column in columns.items()}
+    meta.update((name, column.tobytes()) for name, column in columns.items())
+    return msgpack.packb(meta, use_bin_type=True)
+
+
+def encode_npz(result: Dict[str, Any]) -> bytes:
+    """.npz: câte un array per coloană, plus "meta" (JSON) cu metadatele și vocabularul"""
+    import numpy as np
+
+    meta, columns = columnar(result)
+    buf = io.BytesIO()
+    np.savez(buf, meta=np.array(json.dumps(meta, ensure_ascii=False)), **columns)
+    return buf.getvalue()
+
+
+def compress(body: bytes, accept_encoding: Optional[str]) -> Tuple[bytes, Optional[str]]:
+    """Comprimă cu br (dacă pachetul brotli este instalat) sau gzip, după Accept-Encoding"""
+    if len(body) < COMPRESS_MIN_BYTES:
+        return body, None
+    accepted = {token for token, q in _parse_header(accept_encoding) if q > 0}
+    if "br" in accepted:
+        try:
+            import brotli
+        except ImportError:
+            pass
+        else:
+            return brotli.compress(body, quality=5), "br"
+    if "gzip" in accepted:
+        return gzip.compress(body, compresslevel=5), "gzip"
+    return body, None
+
+
+def encode_result(result: Dict[str, Any], model, accept: Optional[str] = None,
+                  accept_encoding: Optional[str] = None) -> Response:
+    """
+    Răspunsul pentru un rezultat de analiză în formatul negociat
+
+    Calea JSON serializează direct prin modelul pydantic (model_dump_json), fără
+    conversia intermediară în obiecte Python făcută de response_model.
+    """
+    media_type = negotiate(accept)
+    if media_type == MSGPACK:
+        body = encode_msgpack(result)
+    elif media_type == NPZ:
+        body = encode_npz(result)
+    else:
+        body = model.model_validate(result).model_dump_json().encode()
+
+    return compressed_response(body, media_type, accept_encoding, vary="Accept, Accept-Encoding")
+
+
+def compressed_response(body: bytes, media_type: str = JSON, accept_encoding: Optional[str] = None,
+                        vary: str = "Accept-Encoding") -> Response:
+    """Răspunsul cu corpul comprimat după Accept-Encoding (vezi compress)"""
+    body, encoding = compress(body, accept_encoding)
+    headers = {"Vary": vary}
+    if encoding:
+        headers["Content-Encoding"] = encoding
+    return Response(body, media_type=media_type, headers=headers)
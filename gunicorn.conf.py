@@ -0,0 +1,39 @@
+"""
+Profilul de producție multi-proces: gunicorn cu worker-e uvicorn, fiecare cu pool-ul lui de analiză
+
+    gunicorn -c gunicorn.conf.py main:app
+
+Aplicația este încărcată o singură dată în master (preload_app), iar warm-up-ul analizei
+(importurile DSP, nucleele CQT, compilarea JIT) rulează tot acolo, înainte de fork: worker-ele
+web și procesele lor de analiză pornesc deja încălzite și împart paginile în copy-on-write.
+Cache-ul de rezultate, lease-urile single-flight și job-urile sunt în SQLite (CACHE_DIR),
+deci un rezultat calculat de un worker este servit de toate.
+"""
+
+import os
+
+# Worker-ele web servesc HTTP și calculele ușoare (serializare, percuție, MIDI); analiza
+# rulează în pool-urile de procese, împărțite astfel încât totalul să fie cât nucleele
+WEB_CONCURRENCY = int(os.environ.get("WEB_CONCURRENCY", str(min(4, os.cpu_count() or 1))))
+os.environ.setdefault("ANALYSIS_WORKERS", str(max(1, (os.cpu_count() or 1) // WEB_CONCURRENCY)))
+# Warm-up-ul este făcut de master; worker-ele îl găsesc gata (no-op)
+WARMUP_IN_MASTER = os.environ.get("WARMUP_ON_STARTUP", "1") != "0"
+
+bind = f"0.0.0.0:{os.environ.get('PORT', '8000')}"
+workers = WEB_CONCURRENCY
+worker_class = "uvicorn.workers.UvicornWorker"
+preload_app = True
+# Analiza nu blochează event loop-ul worker-elor web, deci heartbeat-ul rămâne activ
+timeout = int(os.environ.get("GUNICORN_TIMEOUT", "60"))
+graceful_timeout = 30
+keepalive = 5
+accesslog = "-"
+
+
+def when_ready(server):
+    """Warm-up-ul în master, după încărcarea aplicației și înainte de pornirea worker-elor"""
+    if WARMUP_IN_MASTER:
+        from workers import _warm_up_process
+
+        server.log.info("Warm-up analiză în master (înainte de fork)")
+        _warm_up_process()
@@ -0,0 +1,131 @@
+"""
+API asincron de job-uri: stocare (SQLite), progres pe etape și planificator în fundal
+"""
+
+import asyncio
+import json
+import os
+import sqlite3
+import time
+import uuid
+from typing import Any, Dict, Optional
+
+from cache import CACHE_DIR, connect
+from workers import ANALYSIS_WORKERS, QueueFullError, analyze_cached
+
+JOBS_CONCURRENCY = int(os.environ.get("JOBS_CONCURRENCY", str(ANALYSIS_WORKERS)))
+JOB_TTL = float(os.environ.get("JOB_TTL", str(24 * 3600)))  # rezultatele rămân 24h
+
+# Etapele raportate clienților, în ordine
+JOB_STAGES = ["queued", "downloading", "decoding", "beats", "chords", "key", "done"]
+
+
+class JobStore:
+    """
+    Starea job-urilor pe disc, partajată între procese (worker-ele scriu progresul direct aici)
+    """
+
+    def __init__(self, path: Optional[str] = None, ttl: float = JOB_TTL):
+        self.path = path or os.path.join(CACHE_DIR, "jobs.sqlite")
+        self.ttl = ttl
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        with connect(self.path, wal=True) as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS jobs ("
+                " id TEXT PRIMARY KEY, url TEXT NOT NULL, status TEXT NOT NULL,"
+                " stage TEXT NOT NULL, progress REAL NOT NULL, result TEXT, error TEXT,"
+                " created REAL NOT NULL, updated REAL NOT NULL)"
+            )
+
+    def create(self, url: str) -> str:
+        job_id = uuid.uuid4().hex
+        now = time.time()
+        with connect(self.path) as conn:
+            conn.execute("DELETE FROM jobs WHERE updated < ?", (now - self.ttl,))
+            conn.execute(
+                "INSERT INTO jobs (id, url, status, stage, progress, created, updated)"
+                " VALUES (?, ?, 'queued', 'queued', 0, ?, ?)",
+                (job_id, url, now, now),
+            )
+        return job_id
+
+    def update(self, job_id: str, **fields):
+        if "result" in fields and fields["result"] is not None:
+            fields["result"] = json.dumps(fields["result"], ensure_ascii=False)
+        fields["updated"] = time.time()
+        columns = ", ".join(f"{name} = ?" for name in fields)
+        with connect(self.path) as conn:
+            conn.execute(f"UPDATE jobs SET {columns} WHERE id = ?", (*fields.values(), job_id))
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        with connect(self.path) as conn:
+            conn.row_factory = sqlite3.Row
+            row = conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        if row is None:
+            return None
+        job = dict(row)
+        job["result"] = json.loads(job["result"]) if job["result"] else None
+        return job
+
+
+class JobProgress:
+    """
+    Callback progress(stage, percent) picklable, trimis în procesul worker
+    """
+
+    def __init__(self, store_path: str, job_id: str):
+        self.store_path = store_path
+        self.job_id = job_id
+        self._last = (None, -1.0)
+
+    def __call__(self, stage: str, percent: float):
+        percent = round(min(max(percent, 0.0), 100.0))
+        if (stage, percent) == self._last:
+            return
+        self._last = (stage, percent)
+        JobStore(self.store_path).update(self.job_id, stage=stage, progress=percent)
+
+
+class JobScheduler:
+    """
+    Rulează job-urile în fundal, cu cel mult `concurrency` analize simultane
+
+    Apelurile JobStore (SQLite) rulează în thread-uri, în afara event loop-ului.
+    """
+
+    def __init__(self, store: JobStore, concurrency: int = JOBS_CONCURRENCY):
+        self.store = store
+        self.concurrency = max(1, concurrency)
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._tasks = set()
+
+    async def submit(self, url: str) -> str:
+        """Înregistrează job-ul și îl programează; returnează imediat ID-ul"""
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.concurrency)
+        job_id = await asyncio.to_thread(self.store.create, url)
+        task = asyncio.create_task(self._run(job_id, url))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return job_id
+
+    async def _run(self, job_id: str, url: str):
+        async with self._semaphore:
+            await asyncio.to_thread(self.store.update, job_id, status="running")
+            progress = JobProgress(self.store.path, job_id)
+            while True:
+                try:
+                    result = await analyze_cached(url, progress)
+                    break
+                except QueueFullError as e:
+                    # Pool-ul este ocupat de cereri sincrone; job-ul așteaptă în loc să eșueze
+                    await asyncio.sleep(min(e.retry_after, 5))
+                except Exception as e:
+                    await asyncio.to_thread(self.store.update, job_id, status="failed", error=str(e))
+                    return
+            await asyncio.to_thread(self.store.update, job_id, status="done", stage="done", progress=100,
+                                    result=result)
+
+
+job_store = JobStore()
+job_scheduler = JobScheduler(job_store)
@@ -0,0 +1,102 @@
+"""
+Aplicația ușoară: endpoint-urile fără DSP (/, /health/, /metrics, /generate-drum-pattern/)
+
+Importă doar FastAPI, pydantic și biblioteca standard, așa că pornește în mult sub o secundă
+(uvicorn lite:app). main.py construiește aplicația completă peste ea.
+"""
+
+from typing import Any, Dict, List
+
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, Response
+from pydantic import BaseModel
+
+from drums import generate_drum_pattern
+from metrics import CONTENT_TYPE, MetricsMiddleware, render
+
+VERSION = "1.0.0"
+
+# Endpoint-urile aplicației ușoare, listate de GET /
+LITE_ENDPOINTS = {
+    "POST /generate-drum-pattern/": "Generează pattern de percuție",
+    "GET /health/": "Verifică starea API-ului",
+    "GET /metrics": "Metrici Prometheus (cereri, etape, cache, erori, coadă)",
+}
+
+
+class DrumPattern(BaseModel):
+    tempo: float
+    pattern: List[Dict[str, Any]]
+    style: str
+
+
+def create_app() -> FastAPI:
+    """
+    Aplicația cu CORS și endpoint-urile fără DSP
+
+    app.state.endpoints este lista afișată de GET /; app.state.health, dacă este setat,
+    returnează câmpuri suplimentare pentru /health/ ("status": "warming" -> 503).
+    """
+    app = FastAPI(title="YouTube Karaoke API", version=VERSION)
+
+    # Adaugă CORS pentru frontend
+    app.add_middleware(
+        CORSMiddleware,
+        allow_origins=["*"],
+        allow_credentials=True,
+        allow_methods=["*"],
+        allow_headers=["*"],
+    )
+    # Numărul și durata cererilor, plus header-ul Server-Timing
+    app.add_middleware(MetricsMiddleware)
+    app.state.endpoints = dict(LITE_ENDPOINTS)
+    app.state.health = None
+
+    @app.post("/generate-drum-pattern/", response_model=DrumPattern)
+    async def generate_drum_pattern_endpoint(tempo: float, style: str = "rock"):
+        """
+        Generează pattern de percuție pentru un tempo și stil dat
+        """
+        try:
+            pattern = generate_drum_pattern(tempo, style)
+            return DrumPattern(
+                tempo=tempo,
+                pattern=pattern,
+                style=style
+            )
+        except Exception as e:
+            raise HTTPException(status_code=400, detail=f"Eroare la generarea pattern-ului: {str(e)}")
+
+    @app.get("/health/")
+    async def health_check(request: Request):
+        """
+        Endpoint pentru verificarea stării API-ului
+        """
+        content = {"status": "healthy", "version": VERSION}
+        if request.app.state.health is not None:
+            content.update(request.app.state.health())
+        return JSONResponse(content, status_code=503 if content["status"] == "warming" else 200)
+
+    @app.get("/metrics")
+    async def metrics_endpoint():
+        """
+        Metricile în formatul text Prometheus
+        """
+        return Response(render(), media_type=CONTENT_TYPE)
+
+    @app.get("/")
+    async def root(request: Request):
+        """
+        Endpoint principal cu informații despre API
+        """
+        return {
+            "message": "YouTube Karaoke API",
+            "version": VERSION,
+            "endpoints": request.app.state.endpoints,
+        }
+
+    return app
+
+
+app = create_app()
@@ -0,0 +1,327 @@
+#!/usr/bin/env python3
+"""
+Test de încărcare: trafic realist pe /analyze/, /generate-drum-pattern/ și /health/
+
+Piesele cerute urmează o distribuție Zipf (câteva piese foarte populare, o coadă lungă),
+iar serverul pornit de script servește fixture-uri audio locale în locul YouTube
+(MEDIA_EXTRACTOR=fixtures), deci rezultatele sunt reproductibile și fără rețea.
+
+Necesită httpx (și gunicorn pentru --workers > 1):
+
+    pip install -r requirements-dev.txt
+    python loadtest.py --requests 600 --concurrency 16
+"""
+
+import asyncio
+import json
+import math
+import os
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Any, Dict, List, Optional
+
+import httpx
+
+from drums import PATTERNS
+
+# Amestecul implicit de cereri (ponderi) și popularitatea pieselor: rangul k are ponderea 1/k^s
+DEFAULT_MIX = {"analyze": 0.6, "drums": 0.3, "health": 0.1}
+ZIPF_EXPONENT = 1.1
+# Fixture-urile generate când nu este dat un director: (durata în secunde, BPM)
+FIXTURE_SONGS = ((30, 90), (30, 120), (30, 140))
+# Toleranța la regresii față de fișierul de referință (debit mai mic, p95 mai mare)
+REGRESSION_TOLERANCE = 1.25
+PERCENTILES = (50, 95, 99)
+# Parametrii care trebuie să coincidă cu ai referinței pentru o comparație validă
+COMPARABLE_CONFIG = ("url", "workers", "requests", "concurrency", "rate", "songs", "mix")
+
+
+def zipf_cum_weights(songs: int, exponent: float = ZIPF_EXPONENT) -> List[float]:
+    """Ponderile cumulate Zipf pentru random.choices (rangul 1 este cea mai populară piesă)"""
+    total, cumulative = 0.0, []
+    for rank in range(1, songs + 1):
+        total += 1.0 / rank ** exponent
+        cumulative.append(total)
+    return cumulative
+
+
+def song_url(tag: str, rank: int) -> str:
+    """URL-ul piesei de rang dat: un ID video distinct (cheie de cache proprie) per rang"""
+    return f"https://youtu.be/{tag}{rank:0{11 - len(tag)}d}"
+
+
+def make_fixtures(directory: str) -> str:
+    """Generează piesele sintetice din FIXTURE_SONGS (progresia C-G-Am-F cu click-uri)"""
+    import soundfile as sf
+
+    from benchmark import synth_song
+
+    os.makedirs(directory, exist_ok=True)
+    for i, (seconds, bpm) in enumerate(FIXTURE_SONGS):
+        y, _ = synth_song(seconds, bpm)
+        sf.write(os.path.join(directory, f"song{i}.wav"), y, 22050)
+        with open(os.path.join(directory, f"song{i}.json"), "w", encoding="utf-8") as f:
+            json.dump({"title": f"Synth {bpm} BPM"}, f)
+    return directory
+
+
+def start_server(port: int, workers: int, cache_dir: str, fixtures_dir: str,
+                 startup_timeout: float = 300.0) -> subprocess.Popen:
+    """
+    Pornește serverul (uvicorn pentru un worker, altfel profilul gunicorn) pe fixture-uri
+    și așteaptă până când /health/ răspunde 200 (după warm-up); log-ul este în cache_dir
+    """
+    os.makedirs(cache_dir, exist_ok=True)
+    root = os.path.dirname(os.path.abspath(__file__))
+    env = dict(os.environ, MEDIA_EXTRACTOR="fixtures", MEDIA_FIXTURES_DIR=fixtures_dir,
+               CACHE_DIR=cache_dir, PORT=str(port), WEB_CONCURRENCY=str(workers))
+    if workers > 1:
+        command = [sys.executable, "-m", "gunicorn", "-c", "gunicorn.conf.py", "main:app"]
+    else:
+        command = [sys.executable, "-m", "uvicorn", "main:app", "--port", str(port), "--no-access-log"]
+    log = open(os.path.join(cache_dir, "server.log"), "wb")
+    server = subprocess.Popen(command, cwd=root, env=env, stdout=log, stderr=subprocess.STDOUT)
+
+    deadline = time.monotonic() + startup_timeout
+    while time.monotonic() < deadline:
+        if server.poll() is not None:
+            with open(log.name, encoding="utf-8", errors="replace") as f:
+                raise RuntimeError(f"Serverul s-a oprit la pornire:\n{f.read()[-2000:]}")
+        try:
+            if httpx.get(f"http://127.0.0.1:{port}/health/", timeout=2).status_code == 200:
+                return server
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.5)
+    server.terminate()
+    raise RuntimeError(f"Serverul nu a devenit healthy în {startup_timeout:.0f}s")
+
+
+def stop_server(server: subprocess.Popen):
+    server.terminate()
+    try:
+        server.wait(timeout=30)
+    except subprocess.TimeoutExpired:
+        server.kill()
+
+
+class LoadGenerator:
+    """
+    Generatorul de trafic: fiecare cerere alege endpoint-ul după amestec și piesa după Zipf
+
+    Fără rate, `concurrency` clienți trimit cereri una după alta (buclă închisă). Cu rate,
+    cererile sosesc Poisson la rate/s indiferent de răspunsuri (buclă deschisă), iar latența
+    se măsoară de la momentul planificat: întârzierile de așteptare nu sunt ascunse.
+    """
+
+    def __init__(self, base_url: str, songs: int = 50, mix: Optional[Dict[str, float]] = None,
+                 tag: str = "zipf", seed: int = 0, timeout: float = 120.0):
+        self.base_url = base_url
+        self.songs = songs
+        self.mix = mix or DEFAULT_MIX
+        self.tag = tag
+        self.timeout = timeout
+        self.random = random.Random(seed)
+        self.cum_weights = zipf_cum_weights(songs)
+        self.records: List[Dict[str, Any]] = []
+
+    def next_request(self):
+        endpoint = self.random.choices(list(self.mix), weights=list(self.mix.values()))[0]
+        rank = self.random.choices(range(1, self.songs + 1), cum_weights=self.cum_weights)[0]
+        if endpoint == "analyze":
+            return endpoint, "POST", "/analyze/", {"json": {"url": song_url(self.tag, rank)}}
+        if endpoint == "drums":
+            style = sorted(PATTERNS)[rank % len(PATTERNS)]
+            params = {"tempo": 80 + rank % 80, "style": style}
+            return endpoint, "POST", "/generate-drum-pattern/", {"params": params}
+        return endpoint, "GET", "/health/", {}
+
+    async def send(self, client: httpx.AsyncClient, request, scheduled: Optional[float] = None):
+        endpoint, method, path, kwargs = request
+        start = scheduled if scheduled is not None else time.perf_counter()
+        record = {"endpoint": endpoint, "status": None, "cache": None, "error": None}
+        try:
+            response = await client.request(method, path, **kwargs)
+            record["status"] = response.status_code
+            # Server-Timing: cache;desc="hit"/"miss" pentru cererile de analiză
+            timing = response.headers.get("server-timing", "")
+            if 'cache;desc="' in timing:
+                record["cache"] = timing.split('cache;desc="', 1)[1].split('"', 1)[0]
+        except httpx.HTTPError as e:
+            record["error"] = type(e).__name__
+        record["latency"] = time.perf_counter() - start
+        self.records.append(record)
+
+    async def run(self, requests: int, concurrency: int = 16, rate: Optional[float] = None) -> float:
+        """Trimite `requests` cereri; returnează durata totală (secunde)"""
+        limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+        async with httpx.AsyncClient(base_url=self.base_url, timeout=self.timeout, limits=limits) as client:
+            plan = [self.next_request() for _ in range(requests)]
+            start = time.perf_counter()
+            if rate:
+                tasks, due = [], start
+                for request in plan:
+                    due += self.random.expovariate(rate)
+                    await asyncio.sleep(max(0.0, due - time.perf_counter()))
+                    tasks.append(asyncio.create_task(self.send(client, request, scheduled=due)))
+                await asyncio.gather(*tasks)
+            else:
+                queue = iter(plan)
+
+                async def user():
+                    for request in queue:
+                        await self.send(client, request)
+
+                await asyncio.gather(*(user() for _ in range(concurrency)))
+            return time.perf_counter() - start
+
+
+def percentile(sorted_values: List[float], p: float) -> float:
+    """Percentila p (nearest-rank) dintr-o listă sortată"""
+    if not sorted_values:
+        return 0.0
+    return sorted_values[max(0, math.ceil(p / 100 * len(sorted_values)) - 1)]
+
+
+def summarize(records: List[Dict[str, Any]], elapsed: float) -> Dict[str, Dict[str, Any]]:
+    """
+    Statisticile per endpoint și totale: debit, percentile de latență (ms), rata erorilor
+    (5xx, 4xx și erori de conexiune; 503 = coadă plină, raportat separat) și rata de hit în cache
+    """
+    groups: Dict[str, List[Dict[str, Any]]] = {"total": records}
+    for record in records:
+        groups.setdefault(record["endpoint"], []).append(record)
+
+    summary = {}
+    for name, group in groups.items():
+        latencies = sorted(r["latency"] for r in group)
+        failed = [r for r in group if r["error"] or r["status"] >= 400]
+        lookups = [r["cache"] for r in group if r["cache"] in ("hit", "miss")]
+        stats = {
+            "requests": len(group),
+            "throughput": len(group) / elapsed,
+            # Debitul util: doar răspunsurile reușite (503-urile rapide nu umflă debitul)
+            "goodput": (len(group) - len(failed)) / elapsed,
+            **{f"p{p}_ms": percentile(latencies, p) * 1000 for p in PERCENTILES},
+            "error_rate": len(failed) / len(group),
+            "rejected_503": sum(r["status"] == 503 for r in group),
+            "errors": sorted({str(r["error"] or r["status"]) for r in failed}),
+        }
+        if lookups:
+            stats["cache_hit_ratio"] = lookups.count("hit") / len(lookups)
+        summary[name] = stats
+    return summary
+
+
+def print_summary(summary: Dict[str, Dict[str, Any]], elapsed: float):
+    print(f"📈 Rezultate ({elapsed:.1f}s):")
+    print(f"   {'endpoint':<10} {'cereri':>7} {'req/s':>8} {'ok/s':>8} {'p50 ms':>8} {'p95 ms':>8} "
+          f"{'p99 ms':>8} {'erori':>7} {'hit cache':>10}")
+    for name, stats in summary.items():
+        hit = f"{stats['cache_hit_ratio']:.0%}" if "cache_hit_ratio" in stats else "-"
+        print(f"   {name:<10} {stats['requests']:>7} {stats['throughput']:>8.1f} {stats['goodput']:>8.1f} "
+              f"{stats['p50_ms']:>8.1f} {stats['p95_ms']:>8.1f} {stats['p99_ms']:>8.1f} "
+              f"{stats['error_rate']:>7.1%} {hit:>10}")
+        if stats["errors"]:
+            print(f"      erori: {', '.join(stats['errors'])} (503 coadă plină: {stats['rejected_503']})")
+
+
+def compare_baseline(summary: Dict[str, Dict[str, Any]], path: str, config: Optional[Dict[str, Any]] = None,
+                     tolerance: float = REGRESSION_TOLERANCE) -> bool:
+    """False dacă debitul util a scăzut sau p95 a crescut peste toleranță față de referință"""
+    with open(path, encoding="utf-8") as f:
+        reference_run = json.load(f)
+    baseline = reference_run["summary"]
+    ok = True
+    print(f"📊 Comparație cu {path} (toleranță {tolerance:.2f}x):")
+    changed = [key for key in COMPARABLE_CONFIG
+               if config is not None and reference_run["config"].get(key) != config.get(key)]
+    if changed:
+        print(f"   ⚠️  Configurație diferită față de referință: {', '.join(changed)}")
+    for name, stats in summary.items():
+        if name not in baseline:
+            continue
+        reference = baseline[name]
+        slower = reference["goodput"] > stats["goodput"] * tolerance
+        later = stats["p95_ms"] > reference["p95_ms"] * tolerance
+        ok = ok and not (slower or later)
+        status = "❌" if slower or later else "✅"
+        print(f"   {status} {name}: {stats['goodput']:.1f} ok/s (referință {reference['goodput']:.1f}), "
+              f"p95 {stats['p95_ms']:.1f} ms (referință {reference['p95_ms']:.1f})")
+    return ok
+
+
+def main_cli():
+    """Funcția principală"""
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Test de încărcare cu popularitate Zipf pe fixture-uri locale")
+    parser.add_argument("--url", help="Server existent (implicit: pornește unul local pe fixture-uri)")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="Worker-e web ale serverului local (peste 1: profilul gunicorn)")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--fixtures", help="Directorul cu fixture-uri audio (implicit: piese sintetice)")
+    parser.add_argument("--requests", type=int, default=500, help="Numărul total de cereri")
+    parser.add_argument("--concurrency", type=int, default=16, help="Clienți simultani (buclă închisă)")
+    parser.add_argument("--rate", type=float,
+                        help="Sosiri Poisson pe secundă (buclă deschisă; --concurrency limitează conexiunile)")
+    parser.add_argument("--songs", type=int, default=50, help="Numărul de piese distincte (ranguri Zipf)")
+    parser.add_argument("--mix", default=",".join(f"{k}={v}" for k, v in DEFAULT_MIX.items()),
+                        help="Ponderile endpoint-urilor (ex. analyze=0.6,drums=0.3,health=0.1)")
+    parser.add_argument("--tag", default="zipf",
+                        help="Prefixul ID-urilor video (alt prefix = cache rece pe un server existent)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--max-error-rate", type=float, default=0.01,
+                        help="Rata maximă de erori (exclusiv 503 coadă plină) înainte de cod de ieșire 1")
+    parser.add_argument("--json", help="Salvează rezultatele (referință pentru --baseline)")
+    parser.add_argument("--baseline", help="Compară cu un fișier --json anterior")
+    args = parser.parse_args()
+
+    mix = {name: float(weight) for name, weight in (item.split("=") for item in args.mix.split(","))}
+    if set(mix) - set(DEFAULT_MIX):
+        parser.error(f"Endpoint-uri necunoscute în --mix: {', '.join(sorted(set(mix) - set(DEFAULT_MIX)))}")
+    if not 1 <= len(args.tag) <= 6:
+        parser.error("--tag trebuie să aibă între 1 și 6 caractere")
+
+    server, workdir = None, None
+    base_url = args.url
+    if base_url is None:
+        workdir = tempfile.mkdtemp(prefix="karaoke-load-")
+        fixtures = args.fixtures or make_fixtures(os.path.join(workdir, "fixtures"))
+        print(f"🚀 Server local: {args.workers} worker(e), fixture-uri din {fixtures}")
+        server = start_server(args.port, args.workers, os.path.join(workdir, "cache"), fixtures)
+        base_url = f"http://127.0.0.1:{args.port}"
+
+    try:
+        generator = LoadGenerator(base_url, args.songs, mix, args.tag, args.seed)
+        mode = f"{args.rate:g} req/s (Poisson)" if args.rate else f"concurență {args.concurrency}"
+        print(f"🔥 {args.requests} cereri, {args.songs} piese (Zipf s={ZIPF_EXPONENT}), {mode}")
+        elapsed = asyncio.run(generator.run(args.requests, args.concurrency, args.rate))
+    finally:
+        if server is not None:
+            stop_server(server)
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    summary = summarize(generator.records, elapsed)
+    print_summary(summary, elapsed)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"config": vars(args), "elapsed": elapsed, "summary": summary}, f, indent=2)
+        print(f"💾 Rezultatele au fost salvate în {args.json}")
+
+    total = summary["total"]
+    errors = (total["error_rate"] * total["requests"] - total["rejected_503"]) / total["requests"]
+    ok = errors <= args.max_error_rate
+    if not ok:
+        print(f"❌ Rata erorilor {errors:.1%} depășește {args.max_error_rate:.1%}")
+    if args.baseline:
+        ok = compare_baseline(summary, args.baseline, vars(args)) and ok
+    exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main_cli()
@@ -1,27 +1,34 @@
-from fastapi import FastAPI, HTTPException
-from fastapi.middleware.cors import CORSMiddleware
+from fastapi import HTTPException, Request
+from fastapi.responses import Response, StreamingResponse
 from pydantic import BaseModel
-import yt_dlp
-import librosa
-import numpy as np
-import tempfile
-import os
-import uvicorn
-from typing import List, Dict, Optional
+from typing import Any, List, Dict, Optional
 import json
-from scipy.signal import find_peaks
+import asyncio
+from urllib.parse import quote
+# librosa/numpy/scipy/yt_dlp nu se importă aici: modulele DSP se încarcă doar pe calea
+# de analiză (warm-up-ul de la pornire le încarcă în fundal)
+from formats import MSGPACK, NPZ, compressed_response, encode_result
+from drums import PATTERNS, arrange_drums, drum_hits
+from lite import create_app
+from metrics import authorized, current_timings
+from workers import PREVIEW_MAX_SECONDS, PREVIEW_SECONDS, WARMUP_ON_STARTUP, analysis_pool, analyze_cached, stream_analysis, QueueFullError, JobTimeoutError
+from jobs import job_scheduler, job_store
+from batch import expand_urls, run_batch
 # from sklearn.cluster import KMeans  # Not used in final implementation
 
-app = FastAPI(title="YouTube Karaoke API", version="1.0.0")
-
-# Adaugă CORS pentru frontend
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=["*"],
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
-)
+# Endpoint-urile fără DSP (/, /health/, /generate-drum-pattern/) vin din aplicația ușoară
+app = create_app()
+app.state.endpoints = {
+    "POST /analyze/": "Analizează un link YouTube",
+    "POST /analyze/stream": "Rezultate parțiale în timp real (NDJSON)",
+    "POST /analyze/batch": "Analiză în lot pentru liste de URL-uri și playlist-uri (NDJSON)",
+    "POST /generate-drum-track/": "Percuție pentru toată piesa, aliniată la beat-uri",
+    "POST /export/midi": "Fișier MIDI karaoke (pian, bas, percuție)",
+    "POST /jobs/": "Programează analiza în fundal (returnează ID-ul job-ului)",
+    "GET /jobs/{id}": "Starea și rezultatul unui job",
+    "GET /jobs/{id}/events": "Progresul job-ului (SSE)",
+    **app.state.endpoints,
+}
 
 class YouTubeLink(BaseModel):
     url: str
@@ -29,363 +36,235 @@ class YouTubeLink(BaseModel):
 class AnalysisResult(BaseModel):
     title: str
     tempo: float
-    chords: List[Dict[str, any]]
+    chords: List[Dict[str, Any]]
     duration: float
     beats: List[float]
+    downbeats: Optional[List[float]] = None
+    tempo_curve: Optional[List[Dict[str, float]]] = None
     key: Optional[str] = None
+    mode: Optional[str] = None
+    key_confidence: Optional[float] = None
     chord_progression: Optional[List[str]] = None
     difficulty: Optional[str] = None
+    partial: bool = False
 
-class DrumPattern(BaseModel):
+class DrumTrack(BaseModel):
     tempo: float
-    pattern: List[Dict[str, any]]
     style: str
+    bars: int
+    pattern: List[Dict[str, Any]]
+
+class BatchRequest(BaseModel):
+    urls: List[str]
+    skip_ids: List[str] = []
 
-def detect_chords_advanced(audio_path: str, sr: int) -> List[Dict[str, any]]:
+class JobStatus(BaseModel):
+    id: str
+    url: str
+    status: str
+    stage: str
+    progress: float
+    result: Optional[AnalysisResult] = None
+    error: Optional[str] = None
+
+async def cached_analysis(url: str, **kwargs) -> Dict[str, Any]:
     """
-    Detectare avansată a acordurilor cu algoritmi spectrali îmbunătățiți
+    analyze_cached cu erorile traduse în răspunsuri HTTP (503 coadă plină, 504 timeout, 400)
     """
     try:
-        # Încarcă audio
-        y, sr = librosa.load(audio_path, sr=sr)
-        
-        # Parametri îmbunătățiți
-        hop_length = 512
-        frame_length = 2048
-        
-        # Calculează chromagram cu parametri optimizați
-        chroma = librosa.feature.chroma_cqt(
-            y=y, sr=sr, hop_length=hop_length, 
-            bins_per_octave=36, norm=2
+        # Cache, apoi un singur job în pool-ul de procese pentru cererile simultane
+        return await analyze_cached(url, **kwargs)
+    except QueueFullError as e:
+        raise HTTPException(
+            status_code=503, detail=str(e), headers={"Retry-After": str(e.retry_after)}
         )
-        
-        # Detectare beat-uri pentru sincronizare
-        tempo, beats = librosa.beat.beat_track(y=y, sr=sr, hop_length=hop_length)
-        beat_frames = librosa.frames_to_samples(beats, hop_length=hop_length)
-        
-        # Dicționar extins de acorduri
-        chord_templates = {
-            # Major chords
-            'C': [1, 0, 0, 0, 1, 0, 0, 1, 0, 0, 0, 0],
-            'G': [1, 0, 0, 0, 1, 0, 0, 0, 0, 1, 0, 0],
-            'F': [1, 0, 0, 0, 0, 1, 0, 0, 0, 0, 1, 0],
-            'D': [1, 0, 0, 1, 0, 0, 0, 0, 1, 0, 0, 0],
-            'A': [1, 0, 0, 0, 0, 1, 0, 0, 1, 0, 0, 0],
-            'E': [1, 0, 0, 0, 0, 1, 0, 0, 0, 0, 1, 0],
-            'B': [1, 0, 0, 0, 0, 1, 0, 0, 0, 0, 0, 1],
-            
-            # Minor chords
-            'Am': [1, 0, 0, 1, 0, 0, 0, 1, 0, 0, 0, 0],
-            'Em': [1, 0, 0, 0, 0, 1, 0, 0, 1, 0, 0, 0],
-            'Dm': [1, 0, 0, 1, 0, 0, 0, 0, 1, 0, 0, 0],
-            'Bm': [1, 0, 0, 0, 0, 1, 0, 0, 0, 0, 0, 1],
-            
-            # Power chords
-            'C5': [1, 0, 0, 0, 1, 0, 0, 0, 0, 0, 0, 0],
-            'G5': [1, 0, 0, 0, 0, 0, 0, 0, 0, 1, 0, 0],
-            'F5': [1, 0, 0, 0, 0, 0, 0, 0, 0, 0, 1, 0],
-            
-            # Suspended chords
-            'Csus2': [1, 0, 0, 0, 0, 0, 0, 1, 0, 0, 0, 0],
-            'Csus4': [1, 0, 0, 0, 0, 1, 0, 1, 0, 0, 0, 0],
-        }
-        
-        chords = []
-        segment_duration = 0.5  # 500ms segmente
-        
-        for i in range(0, len(y), int(sr * segment_duration)):
-            segment = y[i:i + int(sr * segment_duration)]
-            if len(segment) < sr * 0.25:  # Skip segmente prea mici
-                continue
-                
-            # Calculează chroma pentru segment
-            chroma_segment = librosa.feature.chroma_cqt(
-                y=segment, sr=sr, hop_length=hop_length
-            )
-            chroma_avg = np.mean(chroma_segment, axis=1)
-            
-            # Normalizează
-            chroma_avg = chroma_avg / (np.sum(chroma_avg) + 1e-8)
-            
-            # Găsește cel mai similar acord
-            best_chord = "C"
-            best_score = 0
-            
-            for chord_name, template in chord_templates.items():
-                # Calculează similaritatea cosinus
-                template_norm = np.array(template) / (np.sum(template) + 1e-8)
-                score = np.dot(chroma_avg, template_norm) / (
-                    np.linalg.norm(chroma_avg) * np.linalg.norm(template_norm) + 1e-8
-                )
-                
-                if score > best_score:
-                    best_score = score
-                    best_chord = chord_name
-            
-            # Adaugă acordul doar dacă scorul este suficient de bun
-            if best_score > 0.4:  # Prag mai înalt pentru precizie
-                chords.append({
-                    "timp": i / sr,
-                    "acord": best_chord,
-                    "confidence": round(best_score, 3),
-                    "segment_duration": segment_duration
-                })
-        
-        return chords
-        
+    except JobTimeoutError as e:
+        raise HTTPException(status_code=504, detail=str(e))
     except Exception as e:
-        print(f"Eroare la detectarea acordurilor: {e}")
-        return [
-            {"timp": 0, "acord": "C", "confidence": 0.8, "segment_duration": 0.5},
-            {"timp": 2, "acord": "G", "confidence": 0.8, "segment_duration": 0.5},
-            {"timp": 4, "acord": "Am", "confidence": 0.8, "segment_duration": 0.5},
-            {"timp": 6, "acord": "F", "confidence": 0.8, "segment_duration": 0.5},
-        ]
+        raise HTTPException(status_code=400, detail=f"Eroare la analiză: {str(e)}")
 
-def generate_drum_pattern(tempo: float, style: str = "rock") -> List[Dict[str, any]]:
+@app.post("/analyze/", response_model=AnalysisResult, responses={
+    200: {"content": {MSGPACK: {}, NPZ: {}}, "description": "JSON sau, după Accept, structure-of-arrays"}
+})
+async def analyze_youtube(link: YouTubeLink, request: Request, mode: str = "full",
+                          seconds: float = PREVIEW_SECONDS, profile: bool = False):
     """
-    Generează pattern-uri de percuție sincronizate cu tempo-ul
-    """
-    # Calculează durata unei măsuri (4/4 time)
-    beat_duration = 60.0 / tempo  # secunde per beat
-    measure_duration = beat_duration * 4  # 4 beats per measure
-    
-    patterns = {
-        "rock": {
-            "kick": [0, 2],  # Beat-uri 1 și 3
-            "snare": [1, 3],  # Beat-uri 2 și 4
-            "hihat": [0, 0.5, 1, 1.5, 2, 2.5, 3, 3.5]  # 8th notes
-        },
-        "pop": {
-            "kick": [0, 1.5, 2, 3.5],
-            "snare": [1, 3],
-            "hihat": [0, 0.5, 1, 1.5, 2, 2.5, 3, 3.5]
-        },
-        "jazz": {
-            "kick": [0, 2.5],
-            "snare": [1, 3],
-            "hihat": [0, 0.25, 0.5, 0.75, 1, 1.25, 1.5, 1.75, 2, 2.25, 2.5, 2.75, 3, 3.25, 3.5, 3.75]
-        },
-        "electronic": {
-            "kick": [0, 1, 2, 3],
-            "snare": [1, 3],
-            "hihat": [0, 0.25, 0.5, 0.75, 1, 1.25, 1.5, 1.75, 2, 2.25, 2.5, 2.75, 3, 3.25, 3.5, 3.75]
-        }
-    }
-    
-    pattern = patterns.get(style, patterns["rock"])
-    drum_pattern = []
-    
-    # Generează pattern-ul pentru o măsură
-    for beat_time in pattern["kick"]:
-        drum_pattern.append({
-            "time": beat_time * beat_duration,
-            "drum": "kick",
-            "velocity": 0.8
-        })
-    
-    for beat_time in pattern["snare"]:
-        drum_pattern.append({
-            "time": beat_time * beat_duration,
-            "drum": "snare", 
-            "velocity": 0.7
-        })
-    
-    for beat_time in pattern["hihat"]:
-        drum_pattern.append({
-            "time": beat_time * beat_duration,
-            "drum": "hihat",
-            "velocity": 0.5
-        })
-    
-    # Sortează după timp
-    drum_pattern.sort(key=lambda x: x["time"])
-    
-    return drum_pattern
+    Analizează un videoclip YouTube și returnează acordurile, tempo-ul și alte informații
 
-def analyze_chord_progression(chords: List[Dict]) -> List[str]:
-    """
-    Analizează progresia de acorduri pentru a găsi pattern-uri
+    mode=preview analizează doar primele `seconds` secunde (rezultat cu "partial": true);
+    analiza completă ulterioară refolosește caracteristicile calculate pe prefix.
+    Cu Accept: application/msgpack sau application/x-npz răspunsul este compact (coloane).
+    profile=1 (doar cu X-Admin-Token) rulează analiza fără cache, cu profilerul pornit,
+    și returnează stivele eșantionate în format "folded" (flamegraph.pl, speedscope).
     """
-    if not chords:
-        return []
-    
-    # Extrage acordurile unice
-    unique_chords = list(set([chord["acord"] for chord in chords]))
-    
-    # Găsește progresia cea mai comună
-    progression = []
-    for i in range(0, len(chords), 4):  # Grupează în seturi de 4
-        group = chords[i:i+4]
-        if group:
-            progression.extend([chord["acord"] for chord in group])
-    
-    return progression[:8]  # Returnează primele 8 acorduri
+    if mode not in ("full", "preview"):
+        raise HTTPException(status_code=400, detail="mode trebuie să fie 'full' sau 'preview'")
+    if mode == "preview" and not 5 <= seconds <= PREVIEW_MAX_SECONDS:
+        raise HTTPException(status_code=400,
+                            detail=f"seconds trebuie să fie între 5 și {PREVIEW_MAX_SECONDS:g}")
+    if profile and not authorized(request.headers.get("x-admin-token")):
+        raise HTTPException(status_code=403, detail="profile necesită X-Admin-Token")
+    result = await cached_analysis(link.url, preview_seconds=seconds if mode == "preview" else None,
+                                   profile=profile)
+    if profile:
+        return Response(current_timings().profile or "", media_type="text/plain")
+    return encode_result(result, AnalysisResult, request.headers.get("accept"),
+                         request.headers.get("accept-encoding"))
 
-def calculate_difficulty(chords: List[Dict], tempo: float) -> str:
+@app.post("/analyze/stream")
+async def analyze_youtube_stream(link: YouTubeLink):
     """
-    Calculează dificultatea melodiei bazată pe acorduri și tempo
+    Rezultate parțiale în NDJSON: metadate, tempo și beat-uri, acorduri pe măsură ce
+    sunt calculate, apoi cheia și dificultatea
     """
-    if not chords:
-        return "Ușor"
-    
-    # Factorii de dificultate
-    unique_chords = len(set([chord["acord"] for chord in chords]))
-    avg_confidence = np.mean([chord["confidence"] for chord in chords])
-    
-    # Scor de dificultate
-    difficulty_score = 0
-    
-    # Mai multe acorduri = mai dificil
-    if unique_chords <= 3:
-        difficulty_score += 1
-    elif unique_chords <= 5:
-        difficulty_score += 2
-    else:
-        difficulty_score += 3
-    
-    # Tempo mai rapid = mai dificil
-    if tempo <= 80:
-        difficulty_score += 1
-    elif tempo <= 120:
-        difficulty_score += 2
-    else:
-        difficulty_score += 3
-    
-    # Confidență mai mică = mai dificil
-    if avg_confidence < 0.6:
-        difficulty_score += 1
-    
-    if difficulty_score <= 3:
-        return "Ușor"
-    elif difficulty_score <= 5:
-        return "Mediu"
-    else:
-        return "Dificil"
+    events = stream_analysis(link.url)
+    try:
+        # Primul eveniment decide dacă job-ul a fost acceptat (coadă plină -> 503)
+        first = await events.__anext__()
+    except QueueFullError as e:
+        raise HTTPException(
+            status_code=503, detail=str(e), headers={"Retry-After": str(e.retry_after)}
+        )
+
+    async def ndjson():
+        yield json.dumps(first, ensure_ascii=False) + "\n"
+        async for event in events:
+            yield json.dumps(event, ensure_ascii=False) + "\n"
+
+    return StreamingResponse(ndjson(), media_type="application/x-ndjson")
 
-def detect_key(audio_path: str, sr: int) -> str:
+@app.post("/analyze/batch")
+async def analyze_batch(batch: BatchRequest):
     """
-    Detectează cheia melodică cu algoritmi îmbunătățiți
+    Analiză în lot (URL-uri sau playlist-uri); câte o linie JSON per piesă, în ordinea finalizării
     """
     try:
-        y, sr = librosa.load(audio_path, sr=sr)
-        
-        # Calculează chromagram
-        chroma = librosa.feature.chroma_cqt(y=y, sr=sr)
-        
-        # Detectare cheie cu algoritmi mai avansați
-        key_raw = librosa.feature.key_mode(chroma)
-        
-        # Mapează la note muzicale
-        key_mapping = {
-            'C': 'C', 'C#': 'C#', 'D': 'D', 'D#': 'D#',
-            'E': 'E', 'F': 'F', 'F#': 'F#', 'G': 'G',
-            'G#': 'G#', 'A': 'A', 'A#': 'A#', 'B': 'B'
-        }
-        
-        detected_key = key_raw[0] if key_raw[0] else "C"
-        return key_mapping.get(detected_key, "C")
-        
+        urls = await asyncio.to_thread(expand_urls, batch.urls)
     except Exception as e:
-        print(f"Eroare la detectarea cheii: {e}")
-        return "C"
+        raise HTTPException(status_code=400, detail=f"Eroare la citirea playlist-ului: {str(e)}")
 
-@app.post("/analyze/", response_model=AnalysisResult)
-async def analyze_youtube(link: YouTubeLink):
+    async def ndjson():
+        async for record in run_batch(urls, analysis_pool, skip_ids=set(batch.skip_ids)):
+            yield json.dumps(record, ensure_ascii=False) + "\n"
+
+    return StreamingResponse(ndjson(), media_type="application/x-ndjson")
+
+@app.post("/generate-drum-track/", response_model=DrumTrack)
+async def generate_drum_track(link: YouTubeLink, request: Request, style: str = "rock"):
     """
-    Analizează un videoclip YouTube și returnează acordurile, tempo-ul și alte informații
+    Percuția pentru toată piesa: stilul ales, aliniat la beat-urile și măsurile detectate,
+    cu fill-uri la sfârșitul secțiunilor și velocity umanizat
     """
-    try:
-        with tempfile.TemporaryDirectory() as tmpdir:
-            # Descarcă audio din YouTube
-            ydl_opts = {
-                'format': 'bestaudio/best',
-                'outtmpl': f'{tmpdir}/audio.%(ext)s',
-                'quiet': True,
-                'no_warnings': True,
-                'postprocessors': [{
-                    'key': 'FFmpegExtractAudio',
-                    'preferredcodec': 'wav',
-                    'preferredquality': '192',
-                }],
-            }
-            
-            with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-                info = ydl.extract_info(link.url, download=True)
-                audio_path = os.path.join(tmpdir, "audio.wav")
+    if style not in PATTERNS:
+        raise HTTPException(status_code=400, detail=f"style trebuie să fie unul din: {', '.join(PATTERNS)}")
+    result = await cached_analysis(link.url)
+    if len(result["beats"]) < 2:
+        raise HTTPException(status_code=400, detail="Piesa nu are suficiente beat-uri detectate")
+    arrangement = arrange_drums(result["beats"], result.get("downbeats"), style,
+                                result["tempo"], result["duration"])
+    track = {"tempo": arrangement["tempo"], "style": style, "bars": arrangement["bars"],
+             "pattern": drum_hits(arrangement)}
+    return compressed_response(DrumTrack.model_validate(track).model_dump_json().encode(),
+                               accept_encoding=request.headers.get("accept-encoding"))
 
-            # Încarcă audio
-            y, sr = librosa.load(audio_path, sr=None)
-            duration = librosa.get_duration(y=y, sr=sr)
+@app.post("/export/midi", response_class=Response, responses={
+    200: {"content": {"audio/midi": {}}, "description": "SMF Type 1"}
+})
+async def export_midi(link: YouTubeLink, style: str = "rock", drums: bool = True):
+    """
+    Fișier MIDI karaoke din analiza piesei (din cache sau nouă): acordurile la pian,
+    basul și, opțional, percuția în stilul ales, pe track-uri separate
+    """
+    # midi_export importă NumPy: încărcat la prima cerere, nu la pornire
+    from midi_export import render_karaoke_midi
 
-            # Detectare tempo și beats îmbunătățită
-            tempo, beats = librosa.beat.beat_track(
-                y=y, sr=sr, hop_length=512, 
-                start_bpm=120, std_bpm=1.0
-            )
-            beat_times = librosa.frames_to_time(beats, sr=sr).tolist()
+    if style not in PATTERNS:
+        raise HTTPException(status_code=400, detail=f"style trebuie să fie unul din: {', '.join(PATTERNS)}")
+    result = await cached_analysis(link.url)
+    arrangement = None
+    if drums and len(result["beats"]) >= 2:
+        arrangement = arrange_drums(result["beats"], result.get("downbeats"), style,
+                                    result["tempo"], result["duration"])
+    data = render_karaoke_midi(result, arrangement)
+    filename = quote(f"{result.get('title') or 'karaoke'}.mid")
+    return Response(data, media_type="audio/midi",
+                    headers={"Content-Disposition": f"attachment; filename*=UTF-8''{filename}"})
 
-            # Detectare acorduri avansată
-            chords = detect_chords_advanced(audio_path, sr)
-            
-            # Detectare cheie
-            key = detect_key(audio_path, sr)
-            
-            # Analiză progresie acorduri
-            chord_progression = analyze_chord_progression(chords)
-            
-            # Calculare dificultate
-            difficulty = calculate_difficulty(chords, tempo)
+@app.post("/jobs/", status_code=202)
+async def submit_job(link: YouTubeLink):
+    """
+    Programează analiza în fundal și returnează imediat ID-ul job-ului
+    """
+    job_id = await job_scheduler.submit(link.url)
+    return {"job_id": job_id, "status": "queued"}
 
-            return AnalysisResult(
-                title=info.get("title", "Unknown"),
-                tempo=round(tempo, 2),
-                chords=chords,
-                duration=round(duration, 2),
-                beats=beat_times,
-                key=key,
-                chord_progression=chord_progression,
-                difficulty=difficulty
-            )
+@app.get("/jobs/{job_id}", response_model=JobStatus)
+async def get_job(job_id: str, request: Request):
+    """
+    Starea job-ului, etapa curentă, procentul și rezultatul (când este gata)
+    """
+    job = await asyncio.to_thread(job_store.get, job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job inexistent sau expirat")
+    return compressed_response(JobStatus.model_validate(job).model_dump_json().encode(),
+                               accept_encoding=request.headers.get("accept-encoding"))
 
-    except Exception as e:
-        raise HTTPException(status_code=400, detail=f"Eroare la analiză: {str(e)}")
+@app.get("/jobs/{job_id}/events")
+async def job_events(job_id: str):
+    """
+    Flux SSE cu progresul job-ului (etapă și procent), până la finalizare
+    """
+    if await asyncio.to_thread(job_store.get, job_id) is None:
+        raise HTTPException(status_code=404, detail="Job inexistent sau expirat")
+
+    async def stream():
+        last = None
+        while True:
+            job = await asyncio.to_thread(job_store.get, job_id)
+            if job is None:
+                yield "event: error\ndata: {\"detail\": \"Job expirat\"}\n\n"
+                return
+            state = (job["status"], job["stage"], job["progress"])
+            if state != last:
+                last = state
+                payload = {"status": job["status"], "stage": job["stage"], "progress": job["progress"]}
+                yield f"event: progress\ndata: {json.dumps(payload)}\n\n"
+            if job["status"] in ("done", "failed"):
+                event = "done" if job["status"] == "done" else "error"
+                payload = {"result": job["result"]} if event == "done" else {"detail": job["error"]}
+                yield f"event: {event}\ndata: {json.dumps(payload, ensure_ascii=False)}\n\n"
+                return
+            await asyncio.sleep(0.5)
+
+    return StreamingResponse(stream(), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache"})
 
-@app.post("/generate-drum-pattern/", response_model=DrumPattern)
-async def generate_drum_pattern_endpoint(tempo: float, style: str = "rock"):
+@app.on_event("startup")
+async def start_warm_up():
     """
-    Generează pattern de percuție pentru un tempo și stil dat
+    Pornește warm-up-ul analizei în fundal; /health/ răspunde 503 până se termină
     """
-    try:
-        pattern = generate_drum_pattern(tempo, style)
-        return DrumPattern(
-            tempo=tempo,
-            pattern=pattern,
-            style=style
-        )
-    except Exception as e:
-        raise HTTPException(status_code=400, detail=f"Eroare la generarea pattern-ului: {str(e)}")
+    if WARMUP_ON_STARTUP:
+        app.state.warm_up = asyncio.create_task(analysis_pool.warm_up())
 
-@app.get("/health/")
-async def health_check():
+@app.on_event("shutdown")
+def shutdown_workers():
     """
-    Endpoint pentru verificarea stării API-ului
+    Oprește pool-ul de procese la închiderea aplicației
     """
-    return {"status": "healthy", "version": "1.0.0"}
+    analysis_pool.shutdown()
 
-@app.get("/")
-async def root():
+def analysis_health() -> Dict[str, Any]:
     """
-    Endpoint principal cu informații despre API
+    Starea pool-ului de analiză pentru /health/ (503 cât timp rulează warm-up-ul)
     """
+    warming = analysis_pool.warm_state == "warming"
     return {
-        "message": "YouTube Karaoke API",
-        "version": "1.0.0",
-        "endpoints": {
-            "POST /analyze/": "Analizează un link YouTube",
-            "POST /generate-drum-pattern/": "Generează pattern de percuție",
-            "GET /health/": "Verifică starea API-ului"
-        }
+        "status": "warming" if warming else "healthy",
+        "warm": analysis_pool.warm_state == "warm",
+        "analysis_queue": {"pending": analysis_pool.pending, "capacity": analysis_pool.capacity},
     }
 
+app.state.health = analysis_health
+
 # Railway will use: uvicorn main:app --host 0.0.0.0 --port $PORT
\ No newline at end of file
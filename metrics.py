@@ -0,0 +1,357 @@
+"""
+Metrici în format Prometheus (text), timpi pe etape (Server-Timing) și profiler prin eșantionare
+
+Doar biblioteca standard: modulul este importat de aplicația ușoară și de worker-i.
+Etapele analizei rulează în procesele worker; timpii și incrementările de metrici de acolo
+sunt trimise procesului API împreună cu rezultatul (vezi workers._run_with_timeout).
+"""
+
+import hmac
+import os
+import sys
+import threading
+import time
+from collections import Counter as _Samples
+from contextlib import contextmanager, nullcontext
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+# Token-ul pentru funcțiile de admin (X-Admin-Token); gol = profilerul este dezactivat
+ADMIN_TOKEN = os.environ.get("ADMIN_TOKEN", "")
+# Intervalul de eșantionare al profilerului (milisecunde)
+PROFILE_INTERVAL_MS = float(os.environ.get("PROFILE_INTERVAL_MS", "5"))
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Limitele histogramelor (secunde): de la etapele de câteva ms la analizele de minute
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+
+REGISTRY: Dict[str, "_Metric"] = {}
+
+
+def _escape(value: Any) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value))
+
+
+class _Metric:
+    TYPE = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[Tuple[str, ...], Any] = {}
+        self._lock = threading.Lock()
+        REGISTRY[name] = self
+
+    def _key(self, labels: Dict[str, Any]) -> Tuple[str, ...]:
+        return tuple(str(labels.get(name, "")) for name in self.labelnames)
+
+    def _labels(self, key: Tuple[str, ...], extra: Tuple[Tuple[str, str], ...] = ()) -> str:
+        pairs = (*zip(self.labelnames, key), *extra)
+        if not pairs:
+            return ""
+        return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            return [f"{self.name}{self._labels(key)} {_format(value)}"
+                    for key, value in sorted(self._values.items())]
+
+    def render(self) -> str:
+        return "\n".join([f"# HELP {self.name} {self.documentation}",
+                          f"# TYPE {self.name} {self.TYPE}", *self.samples()])
+
+
+class Counter(_Metric):
+    TYPE = "counter"
+
+    def inc(self, value: float = 1.0, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + value
+
+    def value(self, **labels) -> float:
+        return self._values.get(self._key(labels), 0.0)
+
+
+class Gauge(_Metric):
+    TYPE = "gauge"
+
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._function: Optional[Callable[[], float]] = None
+
+    def set(self, value: float, **labels):
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+    def set_function(self, function: Callable[[], float]):
+        """Valoarea (fără etichete) este citită la fiecare scrape"""
+        self._function = function
+
+    def samples(self) -> List[str]:
+        if self._function is not None:
+            self.set(self._function())
+        return super().samples()
+
+
+class Histogram(_Metric):
+    TYPE = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...] = (),
+                 buckets: Tuple[float, ...] = DURATION_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = (*sorted(buckets), float("inf"))
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            counts, total = self._values.get(key, ([0] * len(self.buckets), 0.0))
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[i] += 1
+            self._values[key] = (counts, total + value)
+
+    def samples(self) -> List[str]:
+        lines = []
+        with self._lock:
+            for key, (counts, total) in sorted(self._values.items()):
+                for bound, count in zip(self.buckets, counts):
+                    lines.append(f"{self.name}_bucket{self._labels(key, (('le', _format(bound)),))} {count}")
+                lines.append(f"{self.name}_sum{self._labels(key)} {_format(total)}")
+                lines.append(f"{self.name}_count{self._labels(key)} {counts[-1]}")
+        return lines
+
+
+def render() -> str:
+    """Toate metricile, în formatul text Prometheus (GET /metrics)"""
+    return "\n".join(metric.render() for metric in REGISTRY.values()) + "\n"
+
+
+REQUESTS = Counter("karaoke_http_requests_total", "Cereri HTTP", ("method", "endpoint", "status"))
+REQUEST_SECONDS = Histogram("karaoke_http_request_duration_seconds",
+                            "Durata cererilor HTTP (până la ultimul octet)", ("endpoint",))
+STAGE_SECONDS = Histogram("karaoke_stage_duration_seconds",
+                          "Durata etapelor analizei (exclusiv etapele imbricate)", ("stage",))
+CACHE_REQUESTS = Counter("karaoke_cache_requests_total", "Căutări în cache", ("cache", "result"))
+FAILURES = Counter("karaoke_failures_total", "Erori ale analizei, după etapă", ("stage",))
+AUDIO_SECONDS = Counter("karaoke_audio_seconds_total", "Secunde de audio analizate")
+QUEUE_DEPTH = Gauge("karaoke_analysis_queue_depth", "Job-uri în pool-ul de analiză (în lucru + în așteptare)")
+
+
+class StageTimings:
+    """
+    Timpii pe etape ai unei cereri sau ai unui job
+
+    Timpii sunt exclusivi: cât rulează o etapă imbricată (ex. chroma calculat leneș
+    din etapa de acorduri), etapa părinte nu se cronometrează. Cu forward=True
+    (în worker) incrementările de metrici sunt păstrate pentru procesul API.
+    """
+
+    def __init__(self, forward: bool = False):
+        self.forward = forward
+        self.stages: Dict[str, float] = {}
+        self.descriptions: Dict[str, str] = {}
+        self.increments: List[Tuple[str, float, Dict[str, Any]]] = []
+        self.failed_stage: Optional[str] = None
+        self.profile: Optional[str] = None
+        self._stack: List[List[Any]] = []
+
+    def add(self, name: str, seconds: float):
+        self.stages[name] = self.stages.get(name, 0.0) + seconds
+
+    @contextmanager
+    def stage(self, name: str):
+        now = time.perf_counter()
+        if self._stack:
+            parent = self._stack[-1]
+            self.add(parent[0], now - parent[1])
+        entry = [name, now]
+        self._stack.append(entry)
+        try:
+            yield
+        except BaseException:
+            # Etapa cea mai interioară în care a apărut eroarea
+            if self.failed_stage is None:
+                self.failed_stage = name
+            raise
+        finally:
+            now = time.perf_counter()
+            self.add(name, now - entry[1])
+            self._stack.pop()
+            if self._stack:
+                self._stack[-1][1] = now
+
+    def header(self, total: Optional[float] = None) -> str:
+        """Valoarea header-ului Server-Timing (durate în milisecunde)"""
+        parts = [f"{name};dur={seconds * 1000:.1f}" for name, seconds in self.stages.items()]
+        parts += [f'{name};desc="{_escape(desc)}"' for name, desc in self.descriptions.items()]
+        if total is not None:
+            parts.append(f"app;dur={total * 1000:.1f}")
+        return ", ".join(parts)
+
+    def report(self) -> Dict[str, Any]:
+        """Raportul trimis din worker procesului API (picklable)"""
+        return {"stages": self.stages, "increments": self.increments,
+                "failed_stage": self.failed_stage, "profile": self.profile}
+
+
+_current: ContextVar[Optional[StageTimings]] = ContextVar("stage_timings", default=None)
+
+
+@contextmanager
+def collect(forward: bool = False):
+    """Colectează timpii etapelor din contextul curent într-un StageTimings nou"""
+    timings = StageTimings(forward)
+    token = _current.set(timings)
+    try:
+        yield timings
+    finally:
+        _current.reset(token)
+
+
+def current_timings() -> Optional[StageTimings]:
+    return _current.get()
+
+
+def stage(name: str):
+    """Cronometrează o etapă (no-op în afara unui collect())"""
+    timings = _current.get()
+    return timings.stage(name) if timings is not None else nullcontext()
+
+
+def describe(name: str, description: str):
+    """Adaugă o descriere (ex. cache hit) în Server-Timing-ul cererii curente"""
+    timings = _current.get()
+    if timings is not None:
+        timings.descriptions[name] = description
+
+
+def inc(counter: Counter, value: float = 1.0, **labels):
+    """Incrementează un contor local sau, într-un worker, îl trimite procesului API"""
+    timings = _current.get()
+    if timings is not None and timings.forward:
+        timings.increments.append((counter.name, value, labels))
+    else:
+        counter.inc(value, **labels)
+
+
+def record_job(report: Optional[Dict[str, Any]], elapsed: float, failed: bool = False):
+    """
+    Aplică raportul unui job din worker: histogramele etapelor, timpul de așteptare în
+    coadă, contoarele și, la eroare, etapa care a eșuat; timpii intră și în Server-Timing
+    """
+    if report is None:
+        if failed:
+            FAILURES.inc(stage="pool")
+        return
+    stages = dict(report["stages"])
+    stages["queue"] = max(0.0, elapsed - sum(stages.values()))
+    for name, seconds in stages.items():
+        STAGE_SECONDS.observe(seconds, stage=name)
+    for name, value, labels in report["increments"]:
+        REGISTRY[name].inc(value, **labels)
+    if failed:
+        FAILURES.inc(stage=report["failed_stage"] or "unknown")
+
+    timings = _current.get()
+    if timings is not None:
+        for name, seconds in stages.items():
+            timings.add(name, seconds)
+        if report.get("profile") is not None:
+            timings.profile = report["profile"]
+
+
+def authorized(token: Optional[str]) -> bool:
+    """Token-ul de admin este corect (întotdeauna False dacă ADMIN_TOKEN nu este setat)"""
+    return bool(ADMIN_TOKEN) and hmac.compare_digest((token or "").encode(), ADMIN_TOKEN.encode())
+
+
+class SamplingProfiler:
+    """
+    Profiler prin eșantionare pentru firul care îl pornește
+
+    Un fir separat citește stiva firului țintă la fiecare interval; rezultatul este în
+    formatul "folded" (o stivă pe linie, cu numărul de eșantioane), citit direct de
+    flamegraph.pl și speedscope.
+    """
+
+    def __init__(self, interval: float = PROFILE_INTERVAL_MS / 1000):
+        self.interval = interval
+        self.samples = _Samples()
+        self._target = threading.get_ident()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def _sample(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self._target)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{os.path.basename(code.co_filename)}:{code.co_name}")
+                frame = frame.f_back
+            if stack:
+                self.samples[";".join(reversed(stack))] += 1
+
+    def start(self) -> "SamplingProfiler":
+        self._thread = threading.Thread(target=self._sample, name="sampling-profiler", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> str:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        return "".join(f"{stack} {count}\n" for stack, count in self.samples.most_common())
+
+
+class MetricsMiddleware:
+    """
+    Middleware ASGI: numărul și durata cererilor (după șablonul rutei, ex. /jobs/{job_id})
+    și header-ul Server-Timing cu etapele cronometrate până la începutul răspunsului
+    """
+
+    def __init__(self, app):
+        self.app = app
+        self._paths: Dict[Any, str] = {}
+
+    def _endpoint(self, scope) -> str:
+        endpoint = scope.get("endpoint")
+        if endpoint is None:
+            return "other"
+        if endpoint not in self._paths:
+            routes = getattr(scope.get("app"), "routes", [])
+            self._paths.update((getattr(r, "endpoint", None), getattr(r, "path", "other")) for r in routes)
+        return self._paths.get(endpoint, "other")
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        started = time.perf_counter()
+        status = 500
+
+        async def send_with_timing(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                header = timings.header(time.perf_counter() - started)
+                message["headers"] = [*message.get("headers", []),
+                                      (b"server-timing", header.encode("latin-1", "replace"))]
+            await send(message)
+
+        with collect() as timings:
+            try:
+                await self.app(scope, receive, send_with_timing)
+            finally:
+                endpoint = self._endpoint(scope)
+                REQUESTS.inc(method=scope["method"], endpoint=endpoint, status=status)
+                REQUEST_SECONDS.observe(time.perf_counter() - started, endpoint=endpoint)
@@ -1,21 +1,326 @@
 #!/usr/bin/env python3
 """
 Script pentru exportul pattern-urilor de percuție și progresiilor de acorduri în format MIDI
+
+render_karaoke_midi scrie direct un SMF Type 1 (pian, bas, percuție pe track-uri separate)
+în memorie, cu evenimentele codificate vectorizat; MIDIExporter folosește midiutil.
 """
 
+import io
 import json
-from typing import List, Dict, Any
+import re
+import struct
+from functools import lru_cache
+from typing import Any, BinaryIO, Dict, List, Optional, Tuple
+
+import numpy as np
 from midiutil import MIDIFile
 
+# Rezoluția (tick-uri per pătrime)
+PPQ = 480
+
+PIANO_CHANNEL, BASS_CHANNEL, DRUM_CHANNEL = 0, 1, 9
+PIANO_PROGRAM = 0   # Acoustic Grand Piano
+BASS_PROGRAM = 33   # Electric Bass (finger)
+PIANO_VELOCITY = 80
+BASS_VELOCITY = 70
+# Octavele: fundamentala pianului pornește de la C4, basul de la C2
+PIANO_ROOT = 60
+BASS_ROOT = 36
+BEATS_PER_BAR = 4
+# Durata unei lovituri de percuție (o șaisprezecime)
+DRUM_NOTE_TICKS = PPQ // 4
+# Acordurile identice separate de cel mult atât (secunde) devin o singură notă susținută
+CHORD_MERGE_GAP = 0.05
+
+# Notele General MIDI pentru instrumentele de percuție
+DRUM_NOTES = {
+    "kick": 36,    # Bass Drum 1
+    "snare": 38,   # Acoustic Snare
+    "hihat": 42,   # Closed Hi-Hat
+    "crash": 49,   # Crash Cymbal 1
+    "tom1": 45,    # Low Tom
+    "tom2": 47,    # Mid Tom
+    "tom3": 50,    # High Tom
+}
+
+_PITCH_CLASSES = {"C": 0, "D": 2, "E": 4, "F": 5, "G": 7, "A": 9, "B": 11}
+_ACCIDENTALS = {"": 0, "#": 1, "b": -1}
+
+# Intervalele (semitonuri față de fundamentală) pentru fiecare calitate de acord
+CHORD_INTERVALS = {
+    "": (0, 4, 7),
+    "m": (0, 3, 7),
+    "dim": (0, 3, 6),
+    "aug": (0, 4, 8),
+    "5": (0, 7),
+    "sus2": (0, 2, 7),
+    "sus4": (0, 5, 7),
+    "6": (0, 4, 7, 9),
+    "m6": (0, 3, 7, 9),
+    "7": (0, 4, 7, 10),
+    "maj7": (0, 4, 7, 11),
+    "m7": (0, 3, 7, 10),
+    "mmaj7": (0, 3, 7, 11),
+    "dim7": (0, 3, 6, 9),
+    "m7b5": (0, 3, 6, 10),
+    "7sus4": (0, 5, 7, 10),
+    "add9": (0, 4, 7, 14),
+    "9": (0, 4, 7, 10, 14),
+    "maj9": (0, 4, 7, 11, 14),
+    "m9": (0, 3, 7, 10, 14),
+}
+# Notații alternative pentru aceleași calități
+QUALITY_ALIASES = {
+    "maj": "", "M": "", "min": "m", "-": "m", "M7": "maj7", "min7": "m7", "-7": "m7",
+    "o": "dim", "°": "dim", "+": "aug", "ø": "m7b5", "o7": "dim7", "sus": "sus4",
+}
+
+_CHORD_RE = re.compile(r"^([A-G])([#b]?)([^/]*)(?:/([A-G])([#b]?))?$")
+
+
+@lru_cache(maxsize=None)
+def chord_notes(name: str) -> Optional[Tuple[Tuple[int, ...], int]]:
+    """
+    (notele pianului, nota de bas) pentru un nume de acord: fundamentală cu #/b, calitate
+    și bas opțional după "/" (ex. "F#m7", "Bbmaj7", "C/E"); None dacă nu este un acord
+
+    O calitate necunoscută (extensii rare) devine triada minoră sau majoră, după prefix.
+    """
+    match = _CHORD_RE.match(name.strip())
+    if match is None:
+        return None
+    root, accidental, quality, bass, bass_accidental = match.groups()
+    pc = (_PITCH_CLASSES[root] + _ACCIDENTALS[accidental]) % 12
+    quality = QUALITY_ALIASES.get(quality, quality)
+    intervals = CHORD_INTERVALS.get(quality)
+    if intervals is None:
+        minor = quality.startswith(("m", "min", "-")) and not quality.startswith("maj")
+        intervals = CHORD_INTERVALS["m" if minor else ""]
+    bass_pc = (_PITCH_CLASSES[bass] + _ACCIDENTALS[bass_accidental]) % 12 if bass else pc
+    return tuple(PIANO_ROOT + pc + i for i in intervals), BASS_ROOT + bass_pc
+
+
+def _vlq(value: int) -> bytes:
+    """Număr de lungime variabilă (delta-time, lungimi meta)"""
+    out = [value & 0x7F]
+    value >>= 7
+    while value:
+        out.append(0x80 | (value & 0x7F))
+        value >>= 7
+    return bytes(reversed(out))
+
+
+def _meta(kind: int, data: bytes) -> bytes:
+    """Eveniment meta la delta 0"""
+    return b"\x00\xff" + bytes([kind]) + _vlq(len(data)) + data
+
+
+def _track_chunk(header: bytes, ticks: np.ndarray, status: np.ndarray,
+                 data1: np.ndarray, data2: np.ndarray) -> bytes:
+    """
+    Un chunk MTrk: evenimentele de la început (header, delta 0), apoi evenimentele de 3 octeți
+    sortate după tick (stabil), codificate vectorizat (delta VLQ + status + date), și End of Track
+    """
+    order = np.argsort(ticks, kind="stable")
+    ticks = ticks[order]
+    deltas = np.diff(ticks, prepend=0).astype(np.uint32)
+    rows = np.empty((len(deltas), 7), dtype=np.uint8)
+    for column, shift in enumerate((21, 14, 7, 0)):
+        rows[:, column] = (deltas >> shift) & 0x7F
+    rows[:, :3] |= 0x80
+    rows[:, 4], rows[:, 5], rows[:, 6] = status[order], data1[order], data2[order]
+    # Din cei 4 octeți VLQ se păstrează doar cei necesari (cei mai semnificativi zero cad)
+    length = 1 + (deltas >= 1 << 7) + (deltas >= 1 << 14) + (deltas >= 1 << 21)
+    keep = np.ones(rows.shape, dtype=bool)
+    keep[:, :4] = np.arange(4) >= (4 - length)[:, None]
+    body = header + rows[keep].tobytes() + b"\x00\xff\x2f\x00"
+    return b"MTrk" + struct.pack(">I", len(body)) + body
+
+
+def _note_track(name: str, channel: int, program: Optional[int], on: np.ndarray, off: np.ndarray,
+                notes: np.ndarray, velocities: np.ndarray) -> bytes:
+    """
+    Track cu note: o notă se termină cel târziu la următorul note-on cu aceeași înălțime,
+    iar la același tick note-off-urile sunt înaintea note-on-urilor (notele repetate nu se taie)
+    """
+    n = len(on)
+    order = np.lexsort((on, notes))
+    same = notes[order][1:] == notes[order][:-1]
+    no_next = np.iinfo(np.int64).max
+    next_on = np.full(n, no_next)
+    next_on[order[:-1]] = np.where(same, on[order][1:], no_next)
+    off = np.maximum(np.minimum(off, next_on), on + 1)
+    header = _meta(0x03, name.encode())
+    if program is not None:
+        header += bytes([0, 0xC0 | channel, program])
+    # Off-urile sunt primele în concatenare, iar sortarea stabilă le păstrează înainte la egalitate
+    return _track_chunk(
+        header,
+        np.concatenate((off, on)),
+        np.concatenate((np.full(n, 0x80 | channel), np.full(n, 0x90 | channel))),
+        np.concatenate((notes, notes)),
+        np.concatenate((np.zeros(n, dtype=np.int64), velocities)),
+    )
+
+
+class TempoMap:
+    """
+    Harta de tempo: ancore (secunde, tick) pe downbeat-uri, o măsură = BEATS_PER_BAR pătrimi
+
+    Între două ancore tempo-ul este constant (un eveniment Set Tempo per măsură), deci
+    conversia secunde -> tick-uri este liniară pe porțiuni și măsurile din MIDI cad pe
+    măsurile detectate; înainte de primul și după ultimul downbeat continuă tempo-ul
+    primei, respectiv al ultimei măsuri.
+    """
+
+    def __init__(self, seconds, ticks):
+        self.seconds = np.asarray(seconds, dtype=float)
+        self.ticks = np.asarray(ticks, dtype=np.int64)
+
+    @classmethod
+    def constant(cls, tempo: float) -> "TempoMap":
+        return cls([0.0, 60.0 / tempo], [0, PPQ])
+
+    @classmethod
+    def from_analysis(cls, analysis: Dict[str, Any]) -> "TempoMap":
+        """Din downbeat-urile analizei; tempo constant (analysis["tempo"]) dacă lipsesc"""
+        tempo = float(analysis.get("tempo") or 120.0)
+        downbeats = np.asarray(analysis.get("downbeats") or [], dtype=float)
+        downbeats = downbeats[downbeats >= 0]
+        if len(downbeats) < 2 or np.any(np.diff(downbeats) <= 0):
+            return cls.constant(tempo)
+        bar = BEATS_PER_BAR * PPQ
+        ticks = np.arange(len(downbeats), dtype=np.int64) * bar
+        # Anacruza (până la primul downbeat) la tempo-ul primei măsuri
+        lead = int(round(downbeats[0] * bar / (downbeats[1] - downbeats[0])))
+        if lead > 0:
+            return cls(np.append(0.0, downbeats), np.append(0, ticks + lead))
+        return cls(np.append(0.0, downbeats[1:]), ticks)
+
+    def _slopes(self) -> Tuple[float, float]:
+        """Tick-uri pe secundă în prima și în ultima porțiune (pentru extrapolare)"""
+        s, t = self.seconds, self.ticks
+        return (t[1] - t[0]) / (s[1] - s[0]), (t[-1] - t[-2]) / (s[-1] - s[-2])
+
+    def to_ticks(self, seconds) -> np.ndarray:
+        """Secunde -> tick-uri (rotunjite, cel puțin 0)"""
+        seconds = np.asarray(seconds, dtype=float)
+        first, last = self._slopes()
+        ticks = np.interp(seconds, self.seconds, self.ticks)
+        ticks = np.where(seconds > self.seconds[-1],
+                         self.ticks[-1] + (seconds - self.seconds[-1]) * last, ticks)
+        ticks = np.where(seconds < 0, seconds * first, ticks)
+        return np.maximum(np.round(ticks), 0).astype(np.int64)
+
+    def to_seconds(self, ticks) -> np.ndarray:
+        """Tick-uri -> secunde (inversa lui to_ticks)"""
+        ticks = np.asarray(ticks, dtype=float)
+        _, last = self._slopes()
+        seconds = np.interp(ticks, self.ticks, self.seconds)
+        return np.where(ticks > self.ticks[-1], self.seconds[-1] + (ticks - self.ticks[-1]) / last, seconds)
+
+    def tempo_events(self) -> bytes:
+        """Evenimentele Set Tempo (cu delta-time), câte unul la fiecare schimbare de tempo"""
+        usec = np.round(1e6 * np.diff(self.seconds) / (np.diff(self.ticks) / PPQ)).astype(np.int64)
+        usec = np.clip(usec, 1, 0xFFFFFF)
+        out, previous, last_tick = bytearray(), None, 0
+        for tick, value in zip(self.ticks[:-1].tolist(), usec.tolist()):
+            if value != previous:
+                out += _vlq(tick - last_tick) + b"\xff\x51\x03" + value.to_bytes(3, "big")
+                previous, last_tick = value, tick
+        return bytes(out)
+
+
+def merge_chords(chords: List[Dict[str, Any]]) -> List[Tuple[float, float, str]]:
+    """
+    Intervalele (început, sfârșit, acord) în ordinea timpului, cu acordurile identice
+    consecutive unite într-o singură notă susținută; numele care nu sunt acorduri
+    (ex. "N") sunt omise
+    """
+    spans: List[Tuple[float, float, str]] = []
+    for i, chord in enumerate(chords):
+        name = chord["acord"]
+        if chord_notes(name) is None:
+            continue
+        start = chord["timp"]
+        end = chord.get("timp_final")
+        if end is None:
+            end = chords[i + 1]["timp"] if i + 1 < len(chords) else start + chord.get("segment_duration", 0.5)
+        if spans and spans[-1][2] == name and start <= spans[-1][1] + CHORD_MERGE_GAP:
+            spans[-1] = (spans[-1][0], max(end, spans[-1][1]), name)
+        else:
+            spans.append((start, end, name))
+    return spans
+
+
+def _drum_columns(drums) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """(timpi, note GM, velocity 1-127) dintr-un aranjament drums.arrange_drums sau o listă de lovituri"""
+    if isinstance(drums, dict):
+        table = np.array([DRUM_NOTES[name] for name in drums["drums"]], dtype=np.int64)
+        times, notes, velocity = np.asarray(drums["time"]), table[drums["drum"]], np.asarray(drums["velocity"])
+    else:
+        hits = [hit for hit in drums if hit.get("drum", "kick") in DRUM_NOTES]
+        times = np.fromiter((hit.get("time", 0) for hit in hits), dtype=float, count=len(hits))
+        notes = np.fromiter((DRUM_NOTES[hit.get("drum", "kick")] for hit in hits), dtype=np.int64, count=len(hits))
+        velocity = np.fromiter((hit.get("velocity", 0.7) for hit in hits), dtype=float, count=len(hits))
+    return times, notes, np.clip(np.round(velocity * 127), 1, 127).astype(np.int64)
+
+
+def write_karaoke_midi(analysis: Dict[str, Any], output: BinaryIO, drums=None):
+    """
+    Scrie în output un SMF Type 1 din rezultatul analizei: track-ul de tempo (harta de
+    tempo din downbeat-uri), pianul (acordurile, la timpii lor reali), basul și, cu un
+    aranjament drums.arrange_drums sau o listă de lovituri (timpi în secunde), percuția
+    pe canalul 10
+    """
+    tempo_map = TempoMap.from_analysis(analysis)
+    spans = merge_chords(analysis.get("chords") or [])
+
+    on = tempo_map.to_ticks([start for start, _, _ in spans])
+    off = tempo_map.to_ticks([end for _, end, _ in spans])
+    parsed = [chord_notes(name) for _, _, name in spans]
+    counts = np.fromiter((len(notes) for notes, _ in parsed), dtype=np.int64, count=len(parsed))
+    piano_notes = np.fromiter((note for notes, _ in parsed for note in notes), dtype=np.int64,
+                              count=int(counts.sum()))
+    bass_notes = np.fromiter((bass for _, bass in parsed), dtype=np.int64, count=len(parsed))
+
+    conductor = (_meta(0x03, str(analysis.get("title", "Karaoke")).encode())
+                 + _meta(0x58, bytes([BEATS_PER_BAR, 2, 24, 8]))
+                 + tempo_map.tempo_events() + b"\x00\xff\x2f\x00")
+    tracks = [
+        b"MTrk" + struct.pack(">I", len(conductor)) + conductor,
+        _note_track("Piano", PIANO_CHANNEL, PIANO_PROGRAM, np.repeat(on, counts), np.repeat(off, counts),
+                    piano_notes, np.full(len(piano_notes), PIANO_VELOCITY)),
+        _note_track("Bass", BASS_CHANNEL, BASS_PROGRAM, on, off,
+                    bass_notes, np.full(len(bass_notes), BASS_VELOCITY)),
+    ]
+    if drums is not None and len(drums["time"] if isinstance(drums, dict) else drums):
+        times, notes, velocity = _drum_columns(drums)
+        hits = tempo_map.to_ticks(times)
+        tracks.append(_note_track("Drums", DRUM_CHANNEL, None, hits, hits + DRUM_NOTE_TICKS, notes, velocity))
+
+    output.write(b"MThd" + struct.pack(">IHHH", 6, 1, len(tracks), PPQ))
+    for track in tracks:
+        output.write(track)
+
+
+def render_karaoke_midi(analysis: Dict[str, Any], drums=None) -> bytes:
+    """Fișierul MIDI karaoke (vezi write_karaoke_midi), randat în memorie"""
+    buf = io.BytesIO()
+    write_karaoke_midi(analysis, buf, drums)
+    return buf.getvalue()
+
+
 class MIDIExporter:
     def __init__(self):
         self.midi = None
         self.tempo = 120
         self.time = 0
         
-    def create_midi_file(self, tempo: float = 120):
-        """Creează un fișier MIDI nou"""
-        self.midi = MIDIFile(1)  # 1 track
+    def create_midi_file(self, tempo: float = 120, tracks: int = 3):
+        """Creează un fișier MIDI nou (implicit 3 track-uri: acorduri, bas, percuție)"""
+        self.midi = MIDIFile(tracks)
         self.tempo = tempo
         self.time = 0
         self.midi.addTempo(0, 0, tempo)
@@ -25,24 +330,13 @@ class MIDIExporter:
         if not self.midi:
             raise ValueError("MIDI file not initialized")
             
-        # Mapează instrumentele la note MIDI
-        drum_mapping = {
-            "kick": 36,    # Bass Drum 1
-            "snare": 38,   # Acoustic Snare
-            "hihat": 42,   # Closed Hi-Hat
-            "crash": 49,   # Crash Cymbal 1
-            "tom1": 45,    # Low Tom
-            "tom2": 47,    # Mid Tom
-            "tom3": 50,    # High Tom
-        }
-        
         for hit in pattern:
             drum_type = hit.get("drum", "kick")
             time = hit.get("time", 0)
             velocity = int(hit.get("velocity", 0.7) * 127)
             
-            if drum_type in drum_mapping:
-                note = drum_mapping[drum_type]
+            if drum_type in DRUM_NOTES:
+                note = DRUM_NOTES[drum_type]
                 self.midi.addNote(track, 9, note, time, 0.25, velocity)
                 
     def add_chord_progression(self, chords: List[str], track: int = 0, 
@@ -51,27 +345,10 @@ class MIDIExporter:
         if not self.midi:
             raise ValueError("MIDI file not initialized")
             
-        # Mapează acordurile la note
-        chord_notes = {
-            "C": [60, 64, 67],      # C major
-            "G": [67, 71, 74],      # G major
-            "F": [65, 69, 72],      # F major
-            "Am": [69, 72, 76],     # A minor
-            "Dm": [62, 65, 69],     # D minor
-            "Em": [64, 67, 71],     # E minor
-            "D": [62, 66, 69],      # D major
-            "A": [69, 73, 76],      # A major
-            "E": [64, 68, 71],      # E major
-            "B": [71, 75, 78],      # B major
-            "Bm": [71, 74, 78],     # B minor
-            "C5": [60, 67],         # C power chord
-            "G5": [67, 74],         # G power chord
-            "F5": [65, 72],         # F power chord
-        }
-        
         for i, chord in enumerate(chords):
-            if chord in chord_notes:
-                notes = chord_notes[chord]
+            parsed = chord_notes(chord)
+            if parsed is not None:
+                notes = parsed[0]
                 time = i * duration
                 
                 for note in notes:
@@ -83,27 +360,10 @@ class MIDIExporter:
         if not self.midi:
             raise ValueError("MIDI file not initialized")
             
-        # Notele de bază pentru fiecare acord
-        bass_notes = {
-            "C": 36,   # C1
-            "G": 43,   # G1
-            "F": 41,   # F1
-            "Am": 45,  # A1
-            "Dm": 38,  # D1
-            "Em": 40,  # E1
-            "D": 38,   # D1
-            "A": 45,   # A1
-            "E": 40,   # E1
-            "B": 47,   # B1
-            "Bm": 47,  # B1
-            "C5": 36,  # C1
-            "G5": 43,  # G1
-            "F5": 41,  # F1
-        }
-        
         for i, chord in enumerate(chords):
-            if chord in bass_notes:
-                note = bass_notes[chord]
+            parsed = chord_notes(chord)
+            if parsed is not None:
+                note = parsed[1]
                 time = i * duration
                 self.midi.addNote(track, 1, note, time, duration, velocity)
                 
@@ -117,46 +377,22 @@ class MIDIExporter:
             
     def export_karaoke_midi(self, analysis_result: Dict[str, Any], 
                            filename: str = "karaoke.mid"):
-        """Exportă un fișier MIDI complet pentru karaoke"""
-        self.create_midi_file(analysis_result.get("tempo", 120))
-        
-        # Track 0: Piano (acorduri)
-        chords = [chord["acord"] for chord in analysis_result.get("chords", [])]
-        self.add_chord_progression(chords, track=0, duration=0.5)
-        
-        # Track 1: Bass
-        self.add_bass_line(chords, track=1, duration=0.5)
-        
-        # Track 9: Drums (pattern generat)
-        if "drum_pattern" in analysis_result:
-            self.add_drum_pattern(analysis_result["drum_pattern"], track=9)
-        
-        self.save_midi(filename)
+        """
+        Exportă un fișier MIDI complet pentru karaoke, la timpii reali ai acordurilor
+        (vezi write_karaoke_midi); percuția din analysis_result["drum_pattern"], dacă există
+        """
+        with open(filename, "wb") as output_file:
+            write_karaoke_midi(analysis_result, output_file, analysis_result.get("drum_pattern"))
         return filename
 
 def create_midi_from_analysis(analysis_data: Dict[str, Any], 
                             drum_pattern: List[Dict[str, Any]] = None,
                             output_filename: str = "karaoke_export.mid") -> str:
     """
-    Creează un fișier MIDI din rezultatele analizei
+    Creează un fișier MIDI din rezultatele analizei (timpii pattern-ului de percuție în secunde)
     """
-    exporter = MIDIExporter()
-    
-    # Creează fișierul MIDI
-    exporter.create_midi_file(analysis_data.get("tempo", 120))
-    
-    # Adaugă acordurile
-    chords = [chord["acord"] for chord in analysis_data.get("chords", [])]
-    if chords:
-        exporter.add_chord_progression(chords, track=0, duration=0.5)
-        exporter.add_bass_line(chords, track=1, duration=0.5)
-    
-    # Adaugă percuția dacă este disponibilă
-    if drum_pattern:
-        exporter.add_drum_pattern(drum_pattern, track=9)
-    
-    # Salvează fișierul
-    exporter.save_midi(output_filename)
+    with open(output_filename, "wb") as output_file:
+        write_karaoke_midi(analysis_data, output_file, drum_pattern)
     
     return output_filename
 
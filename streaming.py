@@ -0,0 +1,306 @@
+"""
+Analiză în flux (pe blocuri) pentru înregistrări lungi, cu memorie constantă
+"""
+
+import math
+import os
+import shutil
+import subprocess
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+import librosa
+import numpy as np
+
+from analysis import (
+    ANALYSIS_SR, BINS_PER_OCTAVE, FEATURE_CONTEXT_SECONDS, HOP_LENGTH,
+    analyze_chord_progression, calculate_difficulty, chord_events, decode_chords, estimate_key,
+    estimate_tuning, pool_chroma
+)
+
+# Plafonul de memorie pentru un bloc de analiză; determină durata blocurilor
+STREAM_MEMORY_MB = float(os.environ.get("STREAM_MEMORY_MB", "256"))
+# Peste această durată (secunde), analiza trece automat pe calea în flux
+STREAM_MIN_DURATION = float(os.environ.get("STREAM_MIN_DURATION", "900"))
+
+# Memorie de lucru estimată per eșantion (CQT pe mai multe octave, STFT, mel), în octeți
+_BYTES_PER_SAMPLE = 64
+
+
+def stream_chunk_seconds(sr: int = ANALYSIS_SR, memory_mb: float = STREAM_MEMORY_MB) -> float:
+    """Durata unui bloc astfel încât memoria de lucru să rămână sub plafon"""
+    return float(np.clip(memory_mb * 2**20 / (sr * _BYTES_PER_SAMPLE), 10.0, 120.0))
+
+
+def iter_audio_blocks(audio_path: str, sr: int = ANALYSIS_SR,
+                      block_seconds: float = 10.0) -> Iterator[np.ndarray]:
+    """
+    Decodează fișierul bloc cu bloc (float32 mono la rata sr), fără a-l ține întreg în memorie
+
+    Cu ffmpeg în PATH citește dintr-un pipe f32le; altfel folosește soundfile
+    cu resampling în flux (soxr).
+    """
+    block = int(block_seconds * sr)
+    if shutil.which("ffmpeg") is not None:
+        cmd = [
+            "ffmpeg", "-nostdin", "-v", "error", "-i", audio_path,
+            "-vn", "-ac", "1", "-ar", str(sr), "-f", "f32le", "-",
+        ]
+        proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+        try:
+            while True:
+                data = proc.stdout.read(block * 4)
+                if not data:
+                    break
+                yield np.frombuffer(data, dtype="<f4")
+        finally:
+            proc.kill()
+            proc.wait()
+        return
+
+    import soundfile as sf
+    import soxr
+
+    native_sr = sf.info(audio_path).samplerate
+    resampler = soxr.ResampleStream(native_sr, sr, 1, dtype="float32") if native_sr != sr else None
+    in_block = int(block_seconds * native_sr)
+    for data in sf.blocks(audio_path, blocksize=in_block, dtype="float32", always_2d=True):
+        y = data.mean(axis=1)
+        if resampler is not None:
+            y = resampler.resample_chunk(y, last=len(data) < in_block)
+        if len(y):
+            yield y
+
+
+class StreamingAnalyzer:
+    """
+    Analiză incrementală: feed(bloc) returnează acordurile provizorii (segmente de 500ms)
+    și beat-urile finalizate; summary() decodează acordurile finale ca analiza completă
+
+    Starea purtată între blocuri: un tampon cu contextul audio de la margini,
+    frame-urile chroma ale segmentului de 500ms și ale beat-ului încă incomplete, coada
+    anvelopei de onset (pentru beat tracking), suma chroma (pentru estimarea cheii) și
+    tempo-urile estimate pe blocuri. Memoria de lucru nu crește cu durata înregistrării;
+    pentru Viterbi-ul final se păstrează doar chroma agregată (12 valori per beat).
+    """
+
+    def __init__(self, sr: int = ANALYSIS_SR, hop_length: int = HOP_LENGTH,
+                 chunk_seconds: Optional[float] = None, segment_duration: float = 0.5):
+        self.sr = sr
+        self.hop_length = hop_length
+        self.segment_duration = segment_duration
+        chunk_seconds = chunk_seconds or stream_chunk_seconds(sr)
+        self.context = hop_length * math.ceil(FEATURE_CONTEXT_SECONDS * sr / hop_length)
+        self.chunk = hop_length * math.ceil(chunk_seconds * sr / hop_length)
+
+        self._buffer = np.zeros(0, dtype=np.float32)
+        self._offset = 0      # eșantionul de la începutul tamponului
+        self._emitted = 0     # eșantionul până la care frame-urile au fost procesate
+        self._total = 0       # eșantioane primite
+        self._tuning = None
+
+        self._seg_frames = segment_duration * sr / hop_length
+        self._seg_index = 0
+        self._pending = np.zeros((12, 0))
+        self._chroma_sum = np.zeros(12)
+
+        # Unitățile (început, sfârșit, chroma agregată) pentru decodarea finală: pe beat-uri,
+        # iar segmentele de 500ms pentru înregistrările fără beat-uri
+        self._beat_start = 0
+        self._beat_pending = np.zeros((12, 0))
+        self._beat_units: List[Tuple[np.ndarray, np.ndarray, np.ndarray]] = []
+        self._segment_units: List[Tuple[np.ndarray, np.ndarray, np.ndarray]] = []
+
+        self._onset_tail = np.zeros(0)
+        self._tempos: List[float] = []
+        self._last_beat = -np.inf
+
+        self.chords: List[Dict[str, Any]] = []
+        self.beats: List[float] = []
+
+    def feed(self, y: np.ndarray) -> Dict[str, list]:
+        """Adaugă un bloc audio; procesează când s-a strâns un bloc complet"""
+        self._buffer = np.concatenate((self._buffer, np.asarray(y, dtype=np.float32)))
+        self._total += len(y)
+        events = {"chords": [], "beats": []}
+        while self._offset + len(self._buffer) - self.context - self._emitted >= self.chunk:
+            self._merge(events, self._process(final=False))
+        return events
+
+    def finish(self) -> Dict[str, list]:
+        """Procesează restul tamponului și segmentul final"""
+        events = {"chords": [], "beats": []}
+        if self._offset + len(self._buffer) > self._emitted or self._pending.shape[1]:
+            self._merge(events, self._process(final=True))
+        return events
+
+    @property
+    def tempo(self) -> float:
+        """Tempo-ul estimat până acum (mediana estimărilor pe blocuri)"""
+        return float(np.median(self._tempos)) if self._tempos else 0.0
+
+    def summary(self) -> Dict[str, Any]:
+        """
+        Rezultatul complet, în aceeași schemă ca analysis.analyze_audio: acordurile sunt
+        decodate cu Viterbi pe chroma agregată pe beat-uri, ca în detect_chords_advanced
+        """
+        tempo = self.tempo
+        key = estimate_key(self._chroma_sum)
+        units = self._beat_units if len(self.beats) > 1 else self._segment_units
+        chords = []
+        if units:
+            starts, ends, pooled = (np.concatenate(parts, axis=-1) for parts in zip(*units))
+            chords = decode_chords(starts, ends, pooled, self.sr, self.hop_length)
+        return {
+            "tempo": round(tempo, 2),
+            "chords": chords,
+            "duration": round(self._total / self.sr, 2),
+            "beats": self.beats,
+            "key": key["key"],
+            "mode": key["mode"],
+            "key_confidence": key["confidence"],
+            "chord_progression": analyze_chord_progression(chords),
+            "difficulty": calculate_difficulty(chords, tempo),
+        }
+
+    def _merge(self, events: Dict[str, list], new: Dict[str, list]):
+        for name, items in new.items():
+            events[name].extend(items)
+            getattr(self, name).extend(items)
+
+    def _process(self, final: bool) -> Dict[str, list]:
+        sr, hop = self.sr, self.hop_length
+        window = self._buffer
+        if self._tuning is None:
+            self._tuning = estimate_tuning(window, sr)
+
+        chroma = librosa.feature.chroma_cqt(
+            y=window, sr=sr, hop_length=hop, bins_per_octave=BINS_PER_OCTAVE, norm=2, tuning=self._tuning
+        )
+        onset = librosa.onset.onset_strength(y=window, sr=sr, hop_length=hop)
+
+        # Frame-urile noi: de la ultimul procesat până la marginea dreaptă minus context
+        j0 = (self._emitted - self._offset) // hop
+        if final:
+            j1 = chroma.shape[1]
+            limit = self._offset + len(window)
+        else:
+            # Limita rămâne pe grila de hop, ca frame-urile blocurilor să se alinieze exact
+            j1 = (len(window) - self.context) // hop
+            limit = self._offset + j1 * hop
+        first_frame = self._emitted // hop
+        new_chroma, new_onset = chroma[:, j0:j1], onset[j0:j1]
+
+        self._chroma_sum += new_chroma.sum(axis=1)
+        beats = self._track_beats(new_onset, first_frame)
+        self._pool_beats(new_chroma, beats, final)
+        events = {"chords": self._pool_segments(new_chroma, final), "beats": beats}
+
+        # Păstrează doar contextul stâng pentru următorul bloc
+        self._emitted = limit
+        new_offset = max(0, limit - self.context)
+        self._buffer = window[new_offset - self._offset:]
+        self._offset = new_offset
+        return events
+
+    def _pool_segments(self, new_chroma: np.ndarray, final: bool) -> List[Dict[str, Any]]:
+        """Agregă segmentele de 500ms complete; restul rămâne în așteptare"""
+        start = int(round(self._seg_index * self._seg_frames))
+        self._pending = np.concatenate((self._pending, new_chroma), axis=1)
+        available = start + self._pending.shape[1]
+
+        bounds = np.round(np.arange(self._seg_index, self._seg_index + self._pending.shape[1] / self._seg_frames + 2)
+                          * self._seg_frames).astype(int)
+        bounds = bounds[bounds <= available]
+        if final and bounds[-1] < available:
+            bounds = np.append(bounds, available)
+        if len(bounds) < 2:
+            return []
+
+        starts, ends, pooled = pool_chroma(self._pending, bounds - start)
+        self._segment_units.append((starts + start, ends + start, pooled))
+        self._seg_index += len(bounds) - 1
+        self._pending = self._pending[:, bounds[-1] - start:]
+        return chord_events(pooled, starts + start, ends + start, self.sr, self.hop_length,
+                            self.segment_duration)
+
+    def _pool_beats(self, new_chroma: np.ndarray, beats: List[float], final: bool):
+        """Agregă chroma pe intervalele dintre beat-urile finalizate; restul rămâne în așteptare"""
+        start = self._beat_start
+        self._beat_pending = np.concatenate((self._beat_pending, new_chroma), axis=1)
+        available = start + self._beat_pending.shape[1]
+
+        frames = librosa.time_to_frames(beats, sr=self.sr, hop_length=self.hop_length)
+        bounds = np.concatenate(([start], frames[(frames > start) & (frames < available)]))
+        if final and bounds[-1] < available:
+            bounds = np.append(bounds, available)
+        if len(bounds) < 2:
+            return
+
+        starts, ends, pooled = pool_chroma(self._beat_pending, bounds - start)
+        self._beat_units.append((starts + start, ends + start, pooled))
+        self._beat_pending = self._beat_pending[:, ends[-1]:]
+        self._beat_start = start + ends[-1]
+
+    def _track_beats(self, new_onset: np.ndarray, first_frame: int) -> List[float]:
+        """Beat tracking pe coada anvelopei de onset (context anterior + frame-urile noi)"""
+        if len(new_onset) == 0:
+            return []
+        env = np.concatenate((self._onset_tail, new_onset))
+        env_start = first_frame - len(self._onset_tail)
+        tail = int(8.0 * self.sr / self.hop_length)
+        self._onset_tail = env[-tail:]
+
+        tempo = float(np.atleast_1d(
+            librosa.feature.tempo(onset_envelope=env, sr=self.sr, hop_length=self.hop_length)
+        )[0])
+        if tempo <= 0:
+            return []
+        self._tempos.append(tempo)
+        _, frames = librosa.beat.beat_track(
+            onset_envelope=env, sr=self.sr, hop_length=self.hop_length, bpm=tempo, trim=False
+        )
+        times = librosa.frames_to_time(frames + env_start, sr=self.sr, hop_length=self.hop_length)
+
+        # Emite doar beat-urile noi, la cel puțin o jumătate de perioadă de ultimul emis
+        min_gap = 30.0 / tempo
+        new_start = librosa.frames_to_time(first_frame, sr=self.sr, hop_length=self.hop_length)
+        beats = []
+        for t in times[times >= new_start]:
+            if t - self._last_beat >= min_gap:
+                beats.append(round(float(t), 3))
+                self._last_beat = t
+        return beats
+
+
+def analyze_stream(audio_path: str, sr: int = ANALYSIS_SR,
+                   chunk_seconds: Optional[float] = None) -> Iterator[Dict[str, Any]]:
+    """
+    Generator de evenimente: {"tempo", "chords": [...], "beats": [...]} pe măsură ce
+    blocurile se termină, apoi {"summary": rezultat complet}
+    """
+    analyzer = StreamingAnalyzer(sr=sr, chunk_seconds=chunk_seconds)
+    block_seconds = min(10.0, analyzer.chunk / sr)
+    for block in iter_audio_blocks(audio_path, sr, block_seconds=block_seconds):
+        events = analyzer.feed(block)
+        if events["chords"] or events["beats"]:
+            yield {"tempo": round(analyzer.tempo, 2), **events}
+    events = analyzer.finish()
+    if events["chords"] or events["beats"]:
+        yield {"tempo": round(analyzer.tempo, 2), **events}
+    yield {"summary": analyzer.summary()}
+
+
+def analyze_file_streaming(audio_path: str, sr: int = ANALYSIS_SR,
+                           progress: Optional[Callable[[str, float], None]] = None,
+                           duration: Optional[float] = None) -> Dict[str, Any]:
+    """
+    Analiza completă a unui fișier lung, cu memorie constantă (aceeași schemă ca analyze_audio)
+    """
+    summary = {}
+    for event in analyze_stream(audio_path, sr):
+        if "summary" in event:
+            summary = event["summary"]
+        elif progress and duration and event["chords"]:
+            done = event["chords"][-1]["timp"] / duration
+            progress("chords", 50 + 45 * min(done, 1.0))
+    return summary
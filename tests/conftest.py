@@ -0,0 +1,8 @@
+"""
+Configurare comună: cache-urile modulelor (create la import) ajung într-un director temporar
+"""
+
+import os
+import tempfile
+
+os.environ.setdefault("CACHE_DIR", tempfile.mkdtemp(prefix="karaoke-test-cache-"))
@@ -0,0 +1,194 @@
+"""
+Descărcarea fără rețea: FixtureExtractor în locul yt_dlp, politicile de durată și cache-ul media
+"""
+
+import json
+import time
+import wave
+
+import pytest
+
+from cache import MediaCache
+from download import DownloadManager, DurationError, FixtureExtractor, extract_video_id, media_key
+
+VIDEO_ID = "dQw4w9WgXcQ"
+URL = f"https://youtu.be/{VIDEO_ID}"
+
+
+def write_fixture(directory, name, seconds=1.0, **meta):
+    """Un WAV mut (8 kHz, 16 biți) plus metadatele opționale din <name>.json"""
+    with wave.open(str(directory / f"{name}.wav"), "wb") as f:
+        f.setnchannels(1)
+        f.setsampwidth(2)
+        f.setframerate(8000)
+        f.writeframes(b"\0\0" * int(8000 * seconds))
+    if meta:
+        (directory / f"{name}.json").write_text(json.dumps(meta))
+
+
+@pytest.fixture
+def fixtures(tmp_path):
+    directory = tmp_path / "fixtures"
+    directory.mkdir()
+    return directory
+
+
+@pytest.fixture
+def calls():
+    return []
+
+
+def job(tmp_path, name="job"):
+    """Directorul temporar al unui job (ca TemporaryDirectory din worker)"""
+    directory = tmp_path / name
+    directory.mkdir(exist_ok=True)
+    return str(directory)
+
+
+def manager(fixtures, calls, cache=None, **kwargs):
+    """DownloadManager cu extractorul local; `calls` numără deschiderile extractorului"""
+    def extractor(opts):
+        calls.append(opts)
+        return FixtureExtractor(opts, str(fixtures))
+
+    return DownloadManager(cache=cache, extractor=extractor, **kwargs)
+
+
+@pytest.mark.parametrize("url", [
+    VIDEO_ID,
+    f"https://youtu.be/{VIDEO_ID}",
+    f"https://youtu.be/{VIDEO_ID}?t=42",
+    f"https://www.youtube.com/watch?v={VIDEO_ID}",
+    f"https://m.youtube.com/watch?v={VIDEO_ID}&list=PL123&index=2",
+    f"youtube.com/watch?feature=share&v={VIDEO_ID}",
+    f"https://www.youtube.com/shorts/{VIDEO_ID}",
+    f"https://www.youtube.com/embed/{VIDEO_ID}?start=10",
+    f"https://www.youtube.com/live/{VIDEO_ID}",
+    f"https://www.youtube-nocookie.com/embed/{VIDEO_ID}",
+    f"  https://youtu.be/{VIDEO_ID}  ",
+])
+def test_extract_video_id_variants(url):
+    assert extract_video_id(url) == VIDEO_ID
+    assert media_key(url) == VIDEO_ID
+
+
+@pytest.mark.parametrize("url", [
+    "https://example.com/watch?v=dQw4w9WgXcQ",
+    "https://www.youtube.com/watch?v=short",
+    "https://www.youtube.com/playlist?list=PL123",
+    "not a url",
+])
+def test_extract_video_id_rejects_other_urls(url):
+    assert extract_video_id(url) is None
+    assert media_key(url) == media_key(url)
+    assert media_key(url).startswith("url-")
+
+
+def test_fixture_download_is_cached(tmp_path, fixtures, calls):
+    write_fixture(fixtures, VIDEO_ID, title="Local song")
+    cache = MediaCache(str(tmp_path / "media"))
+    downloads = manager(fixtures, calls, cache)
+
+    info, path = downloads.download(URL, job(tmp_path, "job1"))
+    assert info["title"] == "Local song"
+    assert path.startswith(str(tmp_path / "media"))
+    assert VIDEO_ID in cache
+
+    progress = []
+    info2, path2 = downloads.download(URL, job(tmp_path, "job2"), progress=lambda *args: progress.append(args))
+    assert (info2, path2) == (info, path)
+    assert len(calls) == 1
+    assert progress == [("downloading", 40)]
+
+
+def test_reject_policy_fails_before_download(tmp_path, fixtures, calls):
+    write_fixture(fixtures, VIDEO_ID, duration=600)
+    downloads = manager(fixtures, calls, max_duration=60, duration_policy="reject")
+
+    with pytest.raises(DurationError):
+        downloads.download(URL, job(tmp_path))
+    assert list((tmp_path / "job").iterdir()) == []
+
+
+def test_live_streams_are_rejected(tmp_path, fixtures, calls):
+    write_fixture(fixtures, VIDEO_ID, is_live=True)
+    with pytest.raises(DurationError):
+        manager(fixtures, calls, max_duration=0).download(URL, job(tmp_path))
+
+
+def test_truncate_policy_limits_duration(tmp_path, fixtures, calls):
+    write_fixture(fixtures, VIDEO_ID, duration=600)
+    downloads = manager(fixtures, calls, max_duration=60, duration_policy="truncate")
+
+    info, _ = downloads.download(URL, job(tmp_path))
+    assert info["truncated_at"] == 60
+    assert info["original_duration"] == 600
+    assert info["duration"] == 60
+
+
+def test_cache_entry_invalidated_when_truncation_changes(tmp_path, fixtures, calls):
+    write_fixture(fixtures, VIDEO_ID, duration=600)
+    cache = MediaCache(str(tmp_path / "media"))
+
+    truncated, _ = manager(fixtures, calls, cache, max_duration=60,
+                           duration_policy="truncate").download(URL, job(tmp_path, "job1"))
+    assert truncated["truncated_at"] == 60
+
+    # Altă limită: intrarea trunchiată nu mai este valabilă și se descarcă din nou
+    full, _ = manager(fixtures, calls, cache, max_duration=0).download(URL, job(tmp_path, "job2"))
+    assert len(calls) == 2
+    assert "truncated_at" not in full
+    assert full["duration"] == 600
+    assert "truncated_at" not in cache.get(VIDEO_ID)[0]
+
+    # Aceeași limită ca intrarea din cache: hit
+    manager(fixtures, calls, cache, max_duration=0).download(URL, job(tmp_path, "job3"))
+    assert len(calls) == 2
+
+
+def test_preview_prefix_is_never_cached(tmp_path, fixtures, calls):
+    write_fixture(fixtures, VIDEO_ID, duration=600)
+    cache = MediaCache(str(tmp_path / "media"))
+    downloads = manager(fixtures, calls, cache, max_duration=0)
+
+    _, path = downloads.download(URL, job(tmp_path, "preview"), max_seconds=30)
+    assert VIDEO_ID not in cache
+    assert path.startswith(str(tmp_path / "preview"))
+
+    downloads.download(URL, job(tmp_path, "full"))
+    assert VIDEO_ID in cache
+
+    # Un fișier complet din cache servește și preview-ul, fără extractor
+    _, cached_path = downloads.download(URL, job(tmp_path, "preview2"), max_seconds=30)
+    assert cached_path == cache.get(VIDEO_ID)[1]
+    assert len(calls) == 2
+
+
+def test_media_cache_evicts_least_recently_used_by_size(tmp_path):
+    cache = MediaCache(str(tmp_path / "media"), max_bytes=2500)
+
+    def put(key):
+        source = tmp_path / f"{key}.wav"
+        source.write_bytes(b"\0" * 1000)
+        path = cache.put(key, {"id": key}, str(source))
+        time.sleep(0.01)
+        return path
+
+    path_a, path_b = put("a"), put("b")
+    assert cache.get("a") is not None  # "a" devine cea mai recent folosită
+    time.sleep(0.01)
+    put("c")
+
+    assert "b" not in cache
+    assert not (tmp_path / "media" / "b.wav").exists()
+    assert cache.get("a")[1] == path_a
+    assert "c" in cache
+    assert path_b != path_a
+
+
+def test_media_cache_keeps_new_entry_larger_than_limit(tmp_path):
+    cache = MediaCache(str(tmp_path / "media"), max_bytes=500)
+    source = tmp_path / "big.wav"
+    source.write_bytes(b"\0" * 1000)
+    cache.put("big", {"id": "big"}, str(source))
+    assert "big" in cache
@@ -0,0 +1,28 @@
+"""
+Exportul MIDI: fișiere valide și pentru analize fără acorduri
+"""
+
+import pytest
+
+from midi_export import render_karaoke_midi
+
+NO_CHORD = [{"timp": 0.0, "timp_final": 2.0, "acord": "N"}, {"timp": 2.0, "timp_final": 4.0, "acord": "N"}]
+
+
+def track_count(data: bytes) -> int:
+    assert data[:4] == b"MThd"
+    return int.from_bytes(data[10:12], "big")
+
+
+@pytest.mark.parametrize("chords", [[], NO_CHORD], ids=["empty", "all-N"])
+@pytest.mark.parametrize("grid", [{}, {"beats": [0.5, 1.0, 1.5, 2.0, 2.5], "downbeats": [0.5, 2.5]}],
+                         ids=["constant-tempo", "tempo-map"])
+def test_render_without_chords(chords, grid):
+    data = render_karaoke_midi({"tempo": 120, "chords": chords, **grid})
+    assert track_count(data) >= 1
+
+
+def test_render_without_chords_with_drums():
+    drums = [{"time": 0.5, "drum": "kick", "velocity": 0.8}, {"time": 1.0, "drum": "snare", "velocity": 0.7}]
+    data = render_karaoke_midi({"tempo": 120, "chords": NO_CHORD}, drums)
+    assert b"\x99" in data  # note-on pe canalul de percuție
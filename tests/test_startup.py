@@ -0,0 +1,14 @@
+"""
+Pornirea aplicațiilor: importul în buget și fără module DSP (ca benchmark.py --startup)
+"""
+
+import pytest
+
+from benchmark import STARTUP_BUDGETS, import_time
+
+
+@pytest.mark.parametrize("module", sorted(STARTUP_BUDGETS))
+def test_import_within_budget_without_dsp(module):
+    seconds, heavy = import_time(module)
+    assert heavy == []
+    assert seconds <= STARTUP_BUDGETS[module]
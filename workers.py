@@ -0,0 +1,443 @@
+"""
+Pool de procese pentru descărcare și analiză, în afara event loop-ului asyncio
+"""
+
+import asyncio
+import math
+import multiprocessing
+import os
+import queue
+import signal
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional, Tuple
+
+from cache import ANALYSIS_VERSION, AnalysisCache, FeatureCache, SharedFlight
+from download import cache_key, download_audio
+from metrics import (
+    AUDIO_SECONDS, CACHE_REQUESTS, FAILURES, QUEUE_DEPTH, SamplingProfiler, collect,
+    describe, inc, record_job, stage,
+)
+
+# Modulele DSP (analysis, streaming: librosa, scipy, numba) se importă doar pe calea
+# de analiză, ca procesul API să pornească repede; warm-up-ul le încarcă în fundal
+
+# Configurare pool (variabile de mediu)
+ANALYSIS_WORKERS = int(os.environ.get("ANALYSIS_WORKERS", str(os.cpu_count() or 1)))
+ANALYSIS_QUEUE_SIZE = int(os.environ.get("ANALYSIS_QUEUE_SIZE", str(2 * ANALYSIS_WORKERS)))
+ANALYSIS_TIMEOUT = float(os.environ.get("ANALYSIS_TIMEOUT", "600"))
+# Durata blocurilor pentru rezultatele parțiale: blocuri mici = primul acord mai repede
+EARLY_CHUNK_SECONDS = float(os.environ.get("EARLY_CHUNK_SECONDS", "10"))
+# Modul preview (/analyze/?mode=preview): durata implicită și maximă a prefixului analizat
+PREVIEW_SECONDS = float(os.environ.get("PREVIEW_SECONDS", "45"))
+PREVIEW_MAX_SECONDS = float(os.environ.get("PREVIEW_MAX_SECONDS", "120"))
+# Warm-up la pornire (nuclee CQT + compilare JIT) înainte ca /health/ să raporteze "healthy"
+WARMUP_ON_STARTUP = os.environ.get("WARMUP_ON_STARTUP", "1") != "0"
+
+
+class QueueFullError(Exception):
+    """Coada de analiză este plină; clientul trebuie să reîncerce după retry_after secunde"""
+
+    def __init__(self, retry_after: int):
+        super().__init__(f"Coada de analiză este plină, reîncearcă în {retry_after}s")
+        self.retry_after = retry_after
+
+
+class JobTimeoutError(Exception):
+    """Job-ul a depășit timpul limită"""
+
+
+def _alarm_handler(signum, frame):
+    raise JobTimeoutError("Analiza a depășit timpul limită")
+
+
+def _run_with_timeout(timeout: float, profile: bool, fn: Callable, *args) -> Tuple[Any, Dict[str, Any]]:
+    """
+    Rulează fn în procesul worker, întrerupt cu SIGALRM după timeout secunde
+
+    Returnează (rezultat, raport): timpii pe etape și contoarele pentru procesul API,
+    plus, cu profile, stivele eșantionate. La eroare, raportul este atașat excepției.
+    """
+    previous = signal.signal(signal.SIGALRM, _alarm_handler)
+    signal.setitimer(signal.ITIMER_REAL, timeout)
+    with collect(forward=True) as timings:
+        profiler = SamplingProfiler().start() if profile else None
+        try:
+            result = fn(*args)
+        except Exception as e:
+            e.report = timings.report()
+            raise
+        finally:
+            signal.setitimer(signal.ITIMER_REAL, 0)
+            signal.signal(signal.SIGALRM, previous)
+            if profiler is not None:
+                timings.profile = profiler.stop()
+        return result, timings.report()
+
+
+def analyze_file(audio_path: str, info: Dict[str, Any],
+                 progress: Optional[Callable[[str, float], None]] = None,
+                 key: Optional[str] = None, preview_seconds: Optional[float] = None) -> Dict[str, Any]:
+    """
+    Analiza unui fișier deja descărcat (rulează în worker); info sunt metadatele yt_dlp
+
+    Cu preview_seconds se analizează doar prefixul, iar rezultatul este marcat "partial";
+    caracteristicile prefixului se salvează sub key și sunt refolosite de analiza completă.
+    """
+    from analysis import AnalysisContext, analyze_audio
+    from streaming import STREAM_MIN_DURATION, analyze_file_streaming
+
+    if progress:
+        progress("decoding", 40)
+    duration = info.get("duration") or 0
+    if preview_seconds:
+        ctx = AnalysisContext.from_file(audio_path, duration=preview_seconds)
+        result = analyze_audio(ctx, progress)
+        result["partial"] = not duration or duration > ctx.duration + 1.0
+        if key and result["partial"]:
+            feature_cache.put(key, ctx.prefix_features())
+    elif duration > STREAM_MIN_DURATION:
+        # Înregistrări lungi (live-uri, mixuri): analiză pe blocuri, memorie constantă
+        with stage("streaming"):
+            result = analyze_file_streaming(audio_path, progress=progress, duration=duration)
+    else:
+        ctx = AnalysisContext.from_file(audio_path)
+        prefix = feature_cache.get(key) if key else None
+        if key:
+            inc(CACHE_REQUESTS, cache="features", result="miss" if prefix is None else "hit")
+        if prefix is not None:
+            ctx.resume_from(prefix)
+        result = analyze_audio(ctx, progress)
+
+    inc(AUDIO_SECONDS, result.get("duration") or 0.0)
+    result["title"] = info.get("title", "Unknown")
+    return result
+
+
+def analyze_url(url: str, progress: Optional[Callable[[str, float], None]] = None,
+                preview_seconds: Optional[float] = None) -> Dict[str, Any]:
+    """
+    Job complet: descarcă, decodează o singură dată și analizează (rulează în worker)
+
+    progress(stage, percent) trebuie să fie picklable (ex. jobs.JobProgress).
+    Cu preview_seconds se descarcă și se analizează doar primele secunde.
+    """
+    with tempfile.TemporaryDirectory() as tmpdir:
+        with stage("download"):
+            info, audio_path = download_audio(url, tmpdir, progress, max_seconds=preview_seconds)
+        return analyze_file(audio_path, info, progress, result_key(url), preview_seconds)
+
+
+class QueueEmitter:
+    """
+    Callback emit(event) picklable: trimite evenimentele din worker înapoi prin coada Manager
+    """
+
+    def __init__(self, events_queue):
+        self.events_queue = events_queue
+
+    def __call__(self, event: Dict[str, Any]):
+        self.events_queue.put(event)
+
+
+def stream_url(url: str, emit: Callable[[Dict[str, Any]], None]) -> Optional[Dict[str, Any]]:
+    """
+    Job cu rezultate parțiale: metadate, apoi tempo/beat-uri și acorduri provizorii pe măsură
+    ce fiecare bloc se termină, iar acordurile finale (Viterbi pe beat-uri), cheia și
+    dificultatea la final (rulează în worker)
+
+    Returnează rezultatul complet, pentru cache; None la eroare.
+    """
+    from streaming import analyze_stream
+
+    result = None
+    try:
+        with tempfile.TemporaryDirectory() as tmpdir:
+            def on_info(info):
+                emit({"type": "metadata", "title": info.get("title", "Unknown"),
+                      "duration": info.get("duration")})
+
+            with stage("download"):
+                info, audio_path = download_audio(url, tmpdir, on_info=on_info)
+            for event in analyze_stream(audio_path, chunk_seconds=EARLY_CHUNK_SECONDS):
+                if "summary" in event:
+                    result = event["summary"]
+                    result["title"] = info.get("title", "Unknown")
+                    inc(AUDIO_SECONDS, result["duration"] or 0.0)
+                    emit(summary_event(result))
+                    continue
+                if event["beats"]:
+                    emit({"type": "beats", "tempo": event["tempo"], "beats": event["beats"]})
+                if event["chords"]:
+                    emit({"type": "chords", "chords": event["chords"]})
+    except Exception as e:
+        emit({"type": "error", "detail": f"Eroare la analiză: {e}"})
+        return None
+    emit({"type": "done"})
+    return result
+
+
+def summary_event(result: Dict[str, Any]) -> Dict[str, Any]:
+    """Evenimentul final al fluxului; acordurile lui înlocuiesc acordurile provizorii"""
+    return {"type": "summary", "tempo": result["tempo"], "duration": result["duration"],
+            "key": result["key"], "mode": result.get("mode"), "chords": result["chords"],
+            "chord_progression": result["chord_progression"], "difficulty": result["difficulty"]}
+
+
+def result_key(url: str) -> str:
+    """Cheia de cache a rezultatului pentru url, la versiunea curentă a analizei"""
+    return cache_key(url, ANALYSIS_VERSION)
+
+
+def _warm_up_process():
+    """Warm-up-ul procesului curent: importurile DSP, nucleele CQT și compilarea JIT"""
+    from analysis import warm_up
+
+    warm_up()
+
+
+def _init_worker():
+    """
+    Inițializarea procesului worker: un proces creat prin fork după warm-up moștenește
+    nucleele și codul compilat (no-op); unul pornit "spawn" se încălzește singur
+    """
+    # Handler-ul SIGTERM moștenit de la serverul părinte (uvicorn/gunicorn) doar marchează
+    # oprirea; worker-ul trebuie să se oprească efectiv
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    if WARMUP_ON_STARTUP:
+        _warm_up_process()
+
+
+def _worker_is_warm() -> bool:
+    from analysis import is_warm
+
+    return is_warm()
+
+
+class AnalysisPool:
+    """
+    Pool de procese cu coadă limitată (backpressure) și timeout per job
+    """
+
+    def __init__(self, workers: int = ANALYSIS_WORKERS, queue_size: int = ANALYSIS_QUEUE_SIZE,
+                 timeout: float = ANALYSIS_TIMEOUT):
+        self.workers = max(1, workers)
+        self.queue_size = max(0, queue_size)
+        self.timeout = timeout
+        self.pending = 0
+        self.avg_job_seconds = 60.0
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._manager = None
+        self.warm_state = "cold"
+        self._warming: Optional[asyncio.Future] = None
+
+    @property
+    def executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(max_workers=self.workers, initializer=_init_worker)
+        return self._executor
+
+    async def warm_up(self):
+        """
+        Încălzește procesul părinte, apoi pornește worker-ii (fork după warm-up: copy-on-write)
+
+        Starea trece prin "warming" și ajunge "warm"; la eroare rămâne "cold",
+        iar worker-ii se încălzesc la prima cerere.
+        """
+        self.warm_state = "warming"
+        self._warming = asyncio.ensure_future(asyncio.to_thread(_warm_up_process))
+        try:
+            await asyncio.shield(self._warming)
+            loop = asyncio.get_running_loop()
+            await asyncio.gather(*(loop.run_in_executor(self.executor, _worker_is_warm)
+                                   for _ in range(self.workers)))
+            self.warm_state = "warm"
+        except Exception as e:
+            print(f"Eroare la warm-up: {e}")
+            self.warm_state = "cold"
+
+    @property
+    def capacity(self) -> int:
+        return self.workers + self.queue_size
+
+    def retry_after(self) -> int:
+        """Estimare (secunde) până se eliberează un loc în coadă"""
+        waves = max(1, self.pending - self.workers + 1) / self.workers
+        return max(1, math.ceil(self.avg_job_seconds * waves))
+
+    def check_capacity(self):
+        """Ridică QueueFullError dacă un job nou nu mai încape în coadă"""
+        if self.pending >= self.capacity:
+            raise QueueFullError(self.retry_after())
+
+    async def run(self, fn: Callable, *args, timeout: Optional[float] = None, profile: bool = False) -> Any:
+        """
+        Rulează fn(*args) într-un proces worker; ridică QueueFullError dacă nu mai e loc
+
+        Timpii etapelor din worker ajung în metrici și în Server-Timing-ul cererii curente;
+        cu profile, stivele eșantionate sunt în metrics.current_timings().profile.
+        """
+        self.check_capacity()
+
+        timeout = timeout or self.timeout
+        loop = asyncio.get_running_loop()
+        self.pending += 1
+        started = loop.time()
+        try:
+            if self._warming is not None and not self._warming.done():
+                # Fork-ul în timpul importurilor DSP din thread-ul de warm-up ar moșteni
+                # lock-urile lor ținute, iar worker-ii s-ar bloca: job-ul așteaptă warm-up-ul
+                await asyncio.wait({self._warming})
+            future = loop.run_in_executor(self.executor, _run_with_timeout, timeout, profile, fn, *args)
+            # Marjă peste alarma din worker, pentru cazul în care job-ul a stat în coadă
+            result, report = await asyncio.wait_for(future, timeout * (1 + self.queue_size / self.workers) + 5)
+        except asyncio.TimeoutError:
+            inc(FAILURES, stage="timeout")
+            raise JobTimeoutError("Analiza a depășit timpul limită")
+        except Exception as e:
+            record_job(getattr(e, "report", None), loop.time() - started, failed=True)
+            if isinstance(e, BrokenProcessPool):
+                # Un worker a fost oprit (OOM, semnal): pool-ul este recreat la următorul job
+                self._discard_executor()
+            raise
+        else:
+            record_job(report, loop.time() - started)
+            return result
+        finally:
+            self.pending -= 1
+            self.avg_job_seconds = 0.8 * self.avg_job_seconds + 0.2 * (loop.time() - started)
+
+    def event_queue(self):
+        """Coadă între procese pentru evenimentele job-urilor cu rezultate parțiale"""
+        if self._manager is None:
+            self._manager = multiprocessing.Manager()
+        return self._manager.Queue()
+
+    def _discard_executor(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    def shutdown(self):
+        """
+        Oprește worker-ii explicit: uvicorn re-emite semnalul de oprire după shutdown, iar
+        procesul se termină fără atexit, deci pool-ul nu mai apucă să-și oprească procesele
+        (rămase orfane, cu socket-ul serverului moștenit deschis)
+        """
+        processes = list(self._executor._processes.values()) if self._executor is not None else []
+        self._discard_executor()
+        for process in processes:
+            process.terminate()
+        if self._manager is not None:
+            self._manager.shutdown()
+            self._manager = None
+
+
+analysis_pool = AnalysisPool()
+QUEUE_DEPTH.set_function(lambda: analysis_pool.pending)
+analysis_cache = AnalysisCache()
+feature_cache = FeatureCache()
+inflight = SharedFlight(analysis_cache.path)
+
+
+async def analyze_cached(url: str, progress: Optional[Callable[[str, float], None]] = None,
+                         preview_seconds: Optional[float] = None, profile: bool = False) -> Dict[str, Any]:
+    """
+    Rezultatul din cache sau, la lipsă, un singur job în pool pentru toate cererile simultane
+
+    Pentru un preview, o analiză completă deja în cache este returnată direct.
+    Cu profile, cache-ul este ocolit și job-ul rulează cu profilerul pornit.
+    """
+    key = result_key(url)
+    run_key = f"{key}:preview{preview_seconds:g}" if preview_seconds else key
+
+    async def run_and_store():
+        result = await analysis_pool.run(analyze_url, url, progress, preview_seconds, profile=profile)
+        await asyncio.to_thread(analysis_cache.put, run_key if result.get("partial") else key, result)
+        return result
+
+    if profile:
+        return await run_and_store()
+    for lookup in dict.fromkeys((key, run_key)):
+        cached = await asyncio.to_thread(analysis_cache.get, lookup)
+        if cached is not None:
+            inc(CACHE_REQUESTS, cache="analysis", result="hit")
+            describe("cache", "hit")
+            return cached
+    inc(CACHE_REQUESTS, cache="analysis", result="miss")
+    describe("cache", "miss")
+    # Un job al aceleiași chei în alt proces al serverului: rezultatul lui, din cache-ul comun
+    return await inflight.run(run_key, run_and_store,
+                              lambda: analysis_cache.get(key) or analysis_cache.get(run_key))
+
+
+def result_events(result: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Evenimentele fluxului pentru un rezultat complet (din cache sau de la alt job)"""
+    return [
+        {"type": "metadata", "title": result["title"], "duration": result["duration"]},
+        {"type": "beats", "tempo": result["tempo"], "beats": result["beats"]},
+        {"type": "chords", "chords": result["chords"]},
+        summary_event(result),
+        {"type": "done"},
+    ]
+
+
+async def stream_analysis(url: str) -> AsyncIterator[Dict[str, Any]]:
+    """
+    Evenimentele analizei în ordinea în care sunt calculate (pentru NDJSON)
+
+    Un rezultat din cache este trimis imediat, fără worker. Altfel job-ul rulează în pool
+    sub aceeași cheie single-flight ca analyze_cached, iar evenimentele sosesc printr-o
+    coadă între procese; rezultatul final este salvat în cache înainte de evenimentul
+    "done". Dacă aceeași piesă este deja analizată (alt flux, /analyze/ sau alt proces),
+    cererea așteaptă rezultatul acelui job și îl trimite la final.
+    """
+    key = result_key(url)
+    cached = await asyncio.to_thread(analysis_cache.get, key)
+    inc(CACHE_REQUESTS, cache="analysis", result="miss" if cached is None else "hit")
+    if cached is not None:
+        for event in result_events(cached):
+            yield event
+        return
+
+    if key not in inflight:
+        analysis_pool.check_capacity()
+    events = analysis_pool.event_queue()
+    led = False
+
+    async def run_and_store():
+        nonlocal led
+        led = True
+        result = await analysis_pool.run(stream_url, url, QueueEmitter(events))
+        if result is None:
+            # Eroarea a fost deja trimisă ca eveniment; ceilalți care așteaptă o primesc aici
+            raise RuntimeError("Analiza a eșuat")
+        await asyncio.to_thread(analysis_cache.put, key, result)
+        return result
+
+    task = asyncio.ensure_future(inflight.run(key, run_and_store, lambda: analysis_cache.get(key)))
+    loop = asyncio.get_running_loop()
+    try:
+        while True:
+            try:
+                event = await loop.run_in_executor(None, events.get, True, 0.5)
+            except queue.Empty:
+                if task.done():
+                    error = task.exception()
+                    if error is None and not led:
+                        # Rezultatul job-ului altei cereri
+                        for event in result_events(task.result()):
+                            yield event
+                        return
+                    yield {"type": "error", "detail": str(error or "Job terminat fără rezultat")}
+                    return
+                continue
+            if event["type"] == "done":
+                await task
+            yield event
+            if event["type"] in ("done", "error"):
+                return
+    finally:
+        if not task.done():
+            task.cancel()